@@ -0,0 +1,294 @@
+"""
+Benchmark do processamento de imagens (services/image_service).
+
+Mede o caminho completo do `copiar_imagem` e cada etapa isolada (leitura, hash,
+decodificação, compressão e publicação) sobre um corpus sintético reproduzível,
+reportando imagens/s e latência p50/p95 por etapa e o pico de memória (RSS) do processo
+inteiro. Usa a configuração
+de imagem do .env, mas com API, manifesto e logs próprios desligados/isolados.
+
+Uso (a partir da pasta photos-maxima):
+	python -m benchmarks.benchmark_imagens --saida resultado.json
+	python -m benchmarks.benchmark_imagens --baseline baseline.json --tolerancia 10
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+	sys.path.insert(0, str(BASE_DIR))
+
+from benchmarks.corpus import categoria_do_arquivo, gerar_corpus
+
+CORPUS_PADRAO = Path(tempfile.gettempdir()) / "photos-maxima-benchmark"
+
+
+def _preparar_ambiente(corpus: Path, destino: Path) -> None:
+	"""Variáveis lidas pelo config.py: precisam existir antes de importar os serviços."""
+	os.environ.update(
+		SOURCE_DIR=str(corpus),
+		DEST_DIR=str(destino),
+		API_ENABLED="false",
+		TELEGRAM_ENABLED="false",
+		# Sem manifesto: toda imagem é de fato processada, e o manifesto real não é tocado
+		IMAGE_SKIP_UNCHANGED="false",
+		# Produtos sintéticos não podem aparecer no catálogo real (logs/catalogo.db)
+		CATALOG_ENABLED="false",
+		# O corpus acabou de ser gerado (ctime recente): não deve ser tratado como em cópia
+		READINESS_ESTAVEL_SEGUNDOS="0",
+		APP_LOG_FILE="benchmark.log",
+		PHOTOS_LOG_FILE="benchmark_photos.log",
+	)
+
+
+def _percentil(valores: List[float], percentil: float) -> float:
+	"""Percentil pelo método do rank mais próximo (valores já ordenados)."""
+	if not valores:
+		return 0.0
+	indice = max(0, min(len(valores) - 1, math.ceil(percentil / 100 * len(valores)) - 1))
+	return valores[indice]
+
+
+def _pico_memoria_mb() -> Optional[float]:
+	"""Pico de memória residente do processo até agora, em MB (None se indisponível)."""
+	try:
+		import resource
+
+		pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		# Linux informa em KB; macOS em bytes
+		return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+	except ImportError:
+		pass
+
+	try:
+		import ctypes
+		from ctypes import wintypes
+
+		class _ContadoresMemoria(ctypes.Structure):
+			_fields_ = [
+				("cb", wintypes.DWORD),
+				("PageFaultCount", wintypes.DWORD),
+				("PeakWorkingSetSize", ctypes.c_size_t),
+				("WorkingSetSize", ctypes.c_size_t),
+				("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+				("QuotaPagedPoolUsage", ctypes.c_size_t),
+				("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+				("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+				("PagefileUsage", ctypes.c_size_t),
+				("PeakPagefileUsage", ctypes.c_size_t),
+			]
+
+		contadores = _ContadoresMemoria()
+		contadores.cb = ctypes.sizeof(contadores)
+		processo = ctypes.windll.kernel32.GetCurrentProcess()
+		if ctypes.windll.psapi.GetProcessMemoryInfo(processo, ctypes.byref(contadores), contadores.cb):
+			return round(contadores.PeakWorkingSetSize / (1024 * 1024), 1)
+	except (AttributeError, OSError):
+		pass
+	return None
+
+
+def _estatisticas(latencias: List[float], duracao: float) -> Dict[str, float]:
+	ordenadas = sorted(latencias)
+	return {
+		"imagens": len(ordenadas),
+		"imagens_por_segundo": round(len(ordenadas) / duracao, 2) if duracao > 0 else 0.0,
+		"p50_ms": round(_percentil(ordenadas, 50) * 1000, 2),
+		"p95_ms": round(_percentil(ordenadas, 95) * 1000, 2),
+	}
+
+
+def _medir(itens: list, etapa: Callable, repeticoes: int) -> tuple:
+	"""Executa `etapa` para cada item e devolve (estatísticas, resultados da última rodada)."""
+	latencias = []
+	resultados = []
+	inicio_total = time.perf_counter()
+	for _ in range(repeticoes):
+		resultados = []
+		for item in itens:
+			inicio = time.perf_counter()
+			resultados.append(etapa(item))
+			latencias.append(time.perf_counter() - inicio)
+	return _estatisticas(latencias, time.perf_counter() - inicio_total), resultados
+
+
+def executar(corpus_dir: Path, repeticoes: int, workers: int) -> dict:
+	"""Roda todas as medições e devolve o resultado pronto para gravar em JSON."""
+	# Gerado em outro processo para que o pico de memória medido seja só o do processamento
+	with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+		arquivos = executor.submit(gerar_corpus, corpus_dir).result()
+	destino = Path(tempfile.mkdtemp(prefix="photos-maxima-bench-"))
+	_preparar_ambiente(corpus_dir, destino)
+
+	from PIL import Image, __version__ as versao_pillow
+	from services import image_service
+	from services.image_service import (
+		PRINCIPAL, RENDICOES, _comprimir_ate_limite, _decodificar_reduzida, _publicar, _reduzir,
+		copiar_imagem, parametros_codificacao,
+	)
+
+	etapas = {}
+	try:
+		etapas["leitura"], dados = _medir(arquivos, lambda arquivo: arquivo.read_bytes(), repeticoes)
+		etapas["hash"], _ = _medir(dados, lambda conteudo: hashlib.blake2b(conteudo, digest_size=16).hexdigest(), repeticoes)
+
+		def _decodificar(conteudo: bytes):
+			with Image.open(io.BytesIO(conteudo)) as img:
+				return _decodificar_reduzida(img, RENDICOES[0].largura_max)
+
+		etapas["decodificacao"], decodificadas = _medir(dados, _decodificar, repeticoes)
+
+		def _comprimir(img) -> bytes:
+			principal = b""
+			for rendicao in RENDICOES:
+				img = _reduzir(img, rendicao.largura_max)
+				codificado, _, _ = _comprimir_ate_limite(img, rendicao)
+				if rendicao == PRINCIPAL:
+					principal = codificado
+			return principal
+
+		etapas["compressao"], codificadas = _medir(decodificadas, _comprimir, repeticoes)
+
+		publicar = list(zip(codificadas, (PRINCIPAL.destino(arquivo.stem) for arquivo in arquivos)))
+		etapas["publicacao"], _ = _medir(publicar, lambda item: _publicar(*item), repeticoes)
+
+		etapas["completo"], _ = _medir(arquivos, copiar_imagem, repeticoes)
+
+		# Caminho completo separado por tipo de arquivo do corpus
+		categorias = {}
+		for categoria in dict.fromkeys(categoria_do_arquivo(arquivo) for arquivo in arquivos):
+			do_tipo = [arquivo for arquivo in arquivos if categoria_do_arquivo(arquivo) == categoria]
+			categorias[categoria], _ = _medir(do_tipo, copiar_imagem, repeticoes)
+
+		if workers > 1:
+			etapas[f"completo_{workers}_processos"] = _medir_pool(arquivos, workers, repeticoes)
+	finally:
+		shutil.rmtree(destino, ignore_errors=True)
+
+	return {
+		"data": datetime.now().isoformat(timespec="seconds"),
+		"ambiente": {
+			"python": platform.python_version(),
+			"pillow": versao_pillow,
+			"plataforma": platform.platform(),
+			"cpus": os.cpu_count(),
+		},
+		"parametros": {**json.loads(parametros_codificacao()), "backup": image_service.IMAGE_BACKUP_ENABLED},
+		"repeticoes": repeticoes,
+		"etapas": etapas,
+		"categorias": categorias,
+		# ru_maxrss só cresce: é o pico do processo em todas as etapas, não de uma etapa
+		# (nem dos processos do pool, com --workers)
+		"pico_rss_processo_mb": _pico_memoria_mb(),
+	}
+
+
+def _medir_pool(arquivos: List[Path], workers: int, repeticoes: int) -> Dict[str, float]:
+	"""Vazão do caminho completo com o pool de processos de transcodificação."""
+	import threading
+
+	from services.pipeline_service import ProcessadorImagens, executar_pipeline
+
+	latencias = []
+	lock = threading.Lock()
+
+	with ProcessadorImagens(workers=workers) as processador:
+		# Aquece o pool (spawn dos processos) fora da medição
+		processador.copiar(arquivos[0])
+
+		def _processar(arquivo: Path) -> None:
+			inicio = time.perf_counter()
+			processador.copiar(arquivo)
+			with lock:
+				latencias.append(time.perf_counter() - inicio)
+
+		inicio_total = time.perf_counter()
+		for _ in range(repeticoes):
+			executar_pipeline(iter(arquivos), _processar, workers=workers * 2, tamanho_fila=workers * 4)
+		duracao = time.perf_counter() - inicio_total
+
+	return _estatisticas(latencias, duracao)
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> List[str]:
+	"""
+	Compara as etapas com o baseline e devolve as regressões acima da tolerância (%).
+
+	Regressão = queda de imagens/s ou aumento de p95 maior que `tolerancia`.
+	"""
+	regressoes = []
+	for etapa, medida in atual.get("etapas", {}).items():
+		anterior = baseline.get("etapas", {}).get(etapa)
+		if not anterior:
+			continue
+
+		vazao, vazao_base = medida["imagens_por_segundo"], anterior["imagens_por_segundo"]
+		if vazao_base and (vazao_base - vazao) / vazao_base * 100 > tolerancia:
+			regressoes.append(f"{etapa}: {vazao:.2f} img/s (baseline {vazao_base:.2f}, {(vazao - vazao_base) / vazao_base * 100:+.1f}%)")
+
+		p95, p95_base = medida["p95_ms"], anterior["p95_ms"]
+		if p95_base and (p95 - p95_base) / p95_base * 100 > tolerancia:
+			regressoes.append(f"{etapa}: p95 {p95:.2f} ms (baseline {p95_base:.2f}, {(p95 - p95_base) / p95_base * 100:+.1f}%)")
+	return regressoes
+
+
+def _imprimir(resultado: dict) -> None:
+	print("")
+	print(f"  {'etapa':<28}{'img/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+	for titulo, grupo in (("", resultado["etapas"]), ("completo: ", resultado["categorias"])):
+		for nome, medida in grupo.items():
+			print(
+				f"  {titulo + nome:<28}{medida['imagens_por_segundo']:>10}"
+				f"{medida['p50_ms']:>10}{medida['p95_ms']:>10}"
+			)
+	pico = resultado["pico_rss_processo_mb"]
+	print("")
+	print(f"  Pico de RSS do processo (todas as etapas): {pico if pico is not None else '-'} MB")
+	print("")
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="Benchmark do processamento de imagens")
+	parser.add_argument("--corpus", type=Path, default=CORPUS_PADRAO, help="Pasta do corpus sintético (gerado se necessário)")
+	parser.add_argument("--saida", type=Path, default=Path("benchmark_resultado.json"), help="Arquivo JSON com o resultado")
+	parser.add_argument("--baseline", type=Path, help="Resultado anterior para comparação")
+	parser.add_argument("--tolerancia", type=float, default=10.0, help="Variação aceita em relação ao baseline (%%)")
+	parser.add_argument("--repeticoes", type=int, default=1, help="Rodadas sobre o corpus em cada etapa")
+	parser.add_argument("--workers", type=int, default=0, help="Mede também o caminho completo com N processos")
+	args = parser.parse_args()
+
+	resultado = executar(args.corpus.expanduser().resolve(), max(1, args.repeticoes), args.workers)
+	_imprimir(resultado)
+
+	args.saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+	print(f"  Resultado gravado em {args.saida}")
+
+	if args.baseline:
+		baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+		regressoes = comparar(resultado, baseline, args.tolerancia)
+		if regressoes:
+			print(f"  REGRESSÕES (tolerância {args.tolerancia:.0f}%):")
+			for linha in regressoes:
+				print(f"    - {linha}")
+			return 1
+		print(f"  Sem regressões em relação a {args.baseline} (tolerância {args.tolerancia:.0f}%)")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
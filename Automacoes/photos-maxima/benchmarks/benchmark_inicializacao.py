@@ -0,0 +1,181 @@
+"""
+Relatório de tempo de inicialização do main.py (imports e execução sem trabalho).
+
+Mede, em uma cópia isolada do projeto (logs e estado próprios, numa pasta temporária):
+
+- o tempo de import do main.py por módulo (`python -X importtime`);
+- a duração de uma execução pontual sem imagens novas, com a pré-verificação do
+  índice (SCAN_PRECHECK=true) e sem ela, e se Pillow/requests chegaram a ser
+  importados.
+
+A preparação espera a virada do minuto (até 60 s) para que a origem sintética entre
+na janela e no índice antes das medições.
+
+Uso (a partir da pasta photos-maxima):
+	python -m benchmarks.benchmark_inicializacao
+	python -m benchmarks.benchmark_inicializacao --repeticoes 10 --saida inicializacao.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+# Módulos que a execução sem trabalho não deveria carregar
+MODULOS_PESADOS = ("PIL", "requests", "services.image_service", "services.api_service")
+
+
+def _copiar_projeto(destino: Path) -> Path:
+	"""Copia o código (sem logs, benchmarks e .env) para que o estado real não seja tocado."""
+	projeto = destino / "projeto"
+	shutil.copytree(
+		BASE_DIR,
+		projeto,
+		ignore=shutil.ignore_patterns("logs", "benchmarks", "telegram-bot-service", "__pycache__", ".env", "*.json"),
+	)
+	return projeto
+
+
+def _ambiente(origem: Path, destino: Path, precheck: bool) -> Dict[str, str]:
+	ambiente = dict(os.environ)
+	ambiente.update(
+		SOURCE_DIR=str(origem),
+		DEST_DIR=str(destino),
+		API_ENABLED="false",
+		TELEGRAM_ENABLED="false",
+		SCAN_INDEX_ENABLED="true",
+		SCAN_PRECHECK="true" if precheck else "false",
+		IMAGE_WORKERS="1",
+	)
+	return ambiente
+
+
+def _criar_origem(origem: Path) -> None:
+	from PIL import Image
+
+	for indice, subpasta in enumerate(("", "a", "a/b")):
+		pasta = origem / subpasta
+		pasta.mkdir(parents=True, exist_ok=True)
+		Image.new("RGB", (640, 480), (indice * 60, 90, 160)).save(pasta / f"{indice:03d}.jpg", quality=90)
+
+
+def _importtime(saida_stderr: str) -> List[Tuple[str, int, int]]:
+	"""Linhas do -X importtime como (módulo, próprio µs, acumulado µs)."""
+	linhas = []
+	for linha in saida_stderr.splitlines():
+		if not linha.startswith("import time:") or "self [us]" in linha:
+			continue
+		proprio, acumulado, modulo = linha.split(":", 1)[1].split("|", 2)
+		# Um espaço separa a coluna; o restante é a indentação (profundidade do import)
+		linhas.append((modulo[1:].rstrip(), int(proprio), int(acumulado)))
+	return linhas
+
+
+def _executar(projeto: Path, argumentos: List[str], ambiente: Dict[str, str]) -> Tuple[float, str]:
+	inicio = time.perf_counter()
+	processo = subprocess.run(
+		[sys.executable, "-X", "importtime", *argumentos],
+		cwd=projeto, env=ambiente, capture_output=True, text=True, encoding="utf-8", errors="replace",
+	)
+	duracao = time.perf_counter() - inicio
+	if processo.returncode != 0:
+		raise RuntimeError(f"{' '.join(argumentos)} terminou com código {processo.returncode}:\n{processo.stderr[-2000:]}")
+	return duracao, processo.stderr
+
+
+def _carregados(importacoes: List[Tuple[str, int, int]]) -> List[str]:
+	nomes = {modulo.strip() for modulo, _, _ in importacoes}
+	return [modulo for modulo in MODULOS_PESADOS if modulo in nomes]
+
+
+def _medir_execucao(projeto: Path, ambiente: Dict[str, str], repeticoes: int) -> dict:
+	duracoes = []
+	importacoes: List[Tuple[str, int, int]] = []
+	for _ in range(repeticoes):
+		duracao, stderr = _executar(projeto, ["main.py"], ambiente)
+		duracoes.append(duracao)
+		importacoes = _importtime(stderr)
+	return {
+		"mediana_ms": round(statistics.median(duracoes) * 1000, 1),
+		"minimo_ms": round(min(duracoes) * 1000, 1),
+		"modulos_pesados_carregados": _carregados(importacoes),
+	}
+
+
+def executar(repeticoes: int, maximo_modulos: int) -> dict:
+	with tempfile.TemporaryDirectory(prefix="photos-maxima-inicializacao-") as temporario:
+		temporario = Path(temporario)
+		projeto = _copiar_projeto(temporario)
+		origem, destino = temporario / "origem", temporario / "destino"
+		_criar_origem(origem)
+
+		# Import do main.py, módulo a módulo
+		_, stderr = _executar(projeto, ["-c", "import main"], _ambiente(origem, destino, precheck=True))
+		importacoes = _importtime(stderr)
+		diretos = [item for item in importacoes if not item[0].startswith("  ")]
+		total_us = sum(acumulado for _, _, acumulado in diretos)
+
+		# Primeira execução: processa as imagens e grava o índice; as seguintes não têm trabalho.
+		# Arquivos criados no minuto atual ficam depois do fim da janela (truncado no minuto)
+		# e só entram na execução seguinte: espera o minuto virar e roda mais uma vez
+		_executar(projeto, ["main.py"], _ambiente(origem, destino, precheck=True))
+		time.sleep(61 - time.time() % 60)
+		_executar(projeto, ["main.py"], _ambiente(origem, destino, precheck=True))
+		com_precheck = _medir_execucao(projeto, _ambiente(origem, destino, precheck=True), repeticoes)
+		sem_precheck = _medir_execucao(projeto, _ambiente(origem, destino, precheck=False), repeticoes)
+
+	return {
+		"python": sys.version.split()[0],
+		"repeticoes": repeticoes,
+		"import_main": {
+			"total_ms": round(total_us / 1000, 1),
+			"modulos_pesados_carregados": _carregados(importacoes),
+			"mais_lentos": [
+				{"modulo": modulo.strip(), "acumulado_ms": round(acumulado / 1000, 1), "proprio_ms": round(proprio / 1000, 1)}
+				for modulo, proprio, acumulado in sorted(diretos, key=lambda item: item[2], reverse=True)[:maximo_modulos]
+			],
+		},
+		"execucao_sem_trabalho": {"com_precheck": com_precheck, "sem_precheck": sem_precheck},
+	}
+
+
+def _imprimir(resultado: dict) -> None:
+	importacao = resultado["import_main"]
+	print("")
+	print(f"  Import do main.py: {importacao['total_ms']:.1f} ms")
+	for item in importacao["mais_lentos"]:
+		print(f"    {item['modulo']:<40} {item['acumulado_ms']:>8.1f} ms (próprio {item['proprio_ms']:.1f} ms)")
+	print(f"    Módulos pesados carregados: {', '.join(importacao['modulos_pesados_carregados']) or 'nenhum'}")
+	print("")
+	print(f"  Execução sem imagens novas ({resultado['repeticoes']} repetições):")
+	for nome, medida in resultado["execucao_sem_trabalho"].items():
+		pesados = ", ".join(medida["modulos_pesados_carregados"]) or "nenhum"
+		print(f"    {nome:<14} mediana {medida['mediana_ms']:>7.1f} ms | mínimo {medida['minimo_ms']:>7.1f} ms | pesados: {pesados}")
+	print("")
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="Relatório de tempo de inicialização do main.py")
+	parser.add_argument("--repeticoes", type=int, default=5, help="Execuções medidas em cada cenário")
+	parser.add_argument("--modulos", type=int, default=10, help="Quantidade de módulos no ranking de import")
+	parser.add_argument("--saida", type=Path, help="Grava o resultado em JSON")
+	args = parser.parse_args()
+
+	resultado = executar(max(1, args.repeticoes), args.modulos)
+	_imprimir(resultado)
+	if args.saida:
+		args.saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+		print(f"  Resultado gravado em {args.saida}")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Corpus sintético e reproduzível para o benchmark do processamento de imagens.
+
+As imagens são geradas a partir de uma semente fixa (mesmos bytes a cada geração) e
+cobrem os casos que pesam no dia a dia: PNGs pequenos, JPEGs de 24 MP, PNGs com
+transparência, TIFFs grandes e GIFs com paleta.
+"""
+
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from PIL import Image, ImageDraw
+
+# categoria -> (quantidade, (largura, altura), modo, extensão, opções de gravação)
+CATEGORIAS: Dict[str, Tuple[int, Tuple[int, int], str, str, dict]] = {
+	"png_pequeno": (20, (400, 300), "RGB", ".png", {}),
+	"jpeg_24mp": (3, (6000, 4000), "RGB", ".jpg", {"quality": 92}),
+	"png_alpha": (5, (1200, 1200), "RGBA", ".png", {}),
+	"tiff": (3, (3000, 2000), "RGB", ".tif", {"compression": "tiff_lzw"}),
+	"gif_paleta": (5, (800, 600), "P", ".gif", {}),
+}
+
+_VERSAO_CORPUS = 1
+_MANIFESTO = "corpus.json"
+
+
+def _desenhar(rng: random.Random, tamanho: Tuple[int, int], modo: str) -> Image.Image:
+	"""Gradiente + formas + ruído: conteúdo que não comprime de forma trivial."""
+	largura, altura = tamanho
+	base = Image.linear_gradient("L").resize(tamanho).convert("RGB")
+	desenho = ImageDraw.Draw(base)
+	for _ in range(40):
+		x0, y0 = rng.randrange(largura), rng.randrange(altura)
+		x1, y1 = x0 + rng.randrange(1, largura // 3 + 2), y0 + rng.randrange(1, altura // 3 + 2)
+		cor = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+		if rng.random() < 0.5:
+			desenho.rectangle((x0, y0, x1, y1), fill=cor)
+		else:
+			desenho.ellipse((x0, y0, x1, y1), fill=cor)
+
+	# Ruído em baixa resolução ampliado: textura parecida com a de uma foto
+	ruido_tamanho = (max(1, largura // 8), max(1, altura // 8))
+	ruido = Image.frombytes("RGB", ruido_tamanho, rng.randbytes(ruido_tamanho[0] * ruido_tamanho[1] * 3))
+	imagem = Image.blend(base, ruido.resize(tamanho, Image.BILINEAR), 0.25)
+
+	if modo == "RGBA":
+		alfa = Image.linear_gradient("L").rotate(90).resize(tamanho)
+		imagem.putalpha(alfa)
+	elif modo == "P":
+		imagem = imagem.quantize(colors=128)
+	return imagem
+
+
+def gerar_corpus(diretorio: Path, semente: int = 42) -> List[Path]:
+	"""
+	Gera o corpus em `diretorio` (ou reaproveita um já gerado com os mesmos parâmetros).
+
+	Returns:
+		Arquivos do corpus, em ordem determinística
+	"""
+	diretorio.mkdir(parents=True, exist_ok=True)
+	manifesto = diretorio / _MANIFESTO
+	parametros = {"versao": _VERSAO_CORPUS, "semente": semente, "categorias": list(CATEGORIAS)}
+
+	arquivos = []
+	for categoria, (quantidade, _, _, extensao, _) in CATEGORIAS.items():
+		arquivos.extend(diretorio / categoria / f"{categoria}_{i:03d}{extensao}" for i in range(quantidade))
+
+	try:
+		existente = json.loads(manifesto.read_text(encoding="utf-8"))
+	except (OSError, ValueError):
+		existente = None
+	if existente == parametros and all(arquivo.exists() for arquivo in arquivos):
+		return arquivos
+
+	rng = random.Random(semente)
+	for categoria, (quantidade, tamanho, modo, extensao, opcoes) in CATEGORIAS.items():
+		(diretorio / categoria).mkdir(exist_ok=True)
+		for i in range(quantidade):
+			imagem = _desenhar(rng, tamanho, modo)
+			imagem.save(diretorio / categoria / f"{categoria}_{i:03d}{extensao}", **opcoes)
+
+	# mtime antigo, como em um acervo real (o benchmark dispensa a espera de estabilidade)
+	antigo = time.time() - 3600
+	for arquivo in arquivos:
+		os.utime(arquivo, (antigo, antigo))
+
+	manifesto.write_text(json.dumps(parametros), encoding="utf-8")
+	return arquivos
+
+
+def categoria_do_arquivo(arquivo: Path) -> str:
+	return arquivo.parent.name
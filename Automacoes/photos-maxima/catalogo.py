@@ -0,0 +1,95 @@
+"""
+Consulta ao catálogo de fotos publicadas (logs/catalogo.db).
+
+Uso (a partir da pasta photos-maxima):
+	python catalogo.py produto 12345
+	python catalogo.py recentes --desde 2026-10-01 --limite 100
+	python catalogo.py pendentes-api
+	python catalogo.py sem-foto produtos.txt      (um código por linha; "-" lê da entrada padrão)
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from typing import List
+
+from services import catalog_service
+
+_COLUNAS = (
+	("atualizado_em", "Atualizado em"),
+	("produto", "Produto"),
+	("formato", "Formato"),
+	("largura", "Larg."),
+	("altura", "Alt."),
+	("qualidade", "Qual."),
+	("tamanho_bytes", "Bytes"),
+	("tempo_ms", "Tempo ms"),
+	("api_status", "API"),
+	("destino", "Destino"),
+)
+
+
+def _imprimir(linhas: List[dict], como_json: bool) -> None:
+	if como_json:
+		print(json.dumps(linhas, indent=2, ensure_ascii=False))
+		return
+	if not linhas:
+		print("Nenhum registro encontrado.")
+		return
+
+	tabela = [[titulo for _, titulo in _COLUNAS]]
+	tabela.extend([str(linha[coluna]) for coluna, _ in _COLUNAS] for linha in linhas)
+	larguras = [max(len(valores[i]) for valores in tabela) for i in range(len(_COLUNAS))]
+	for valores in tabela:
+		print("  ".join(valor.ljust(largura) for valor, largura in zip(valores, larguras)).rstrip())
+
+
+def _ler_produtos(arquivo: str) -> List[str]:
+	"""Lê um código de produto por linha (em CSV, usa a primeira coluna)."""
+	if arquivo == "-":
+		linhas = sys.stdin.read().splitlines()
+	else:
+		with open(arquivo, encoding="utf-8-sig") as entrada:
+			linhas = entrada.read().splitlines()
+	return [linha.split(";")[0].split(",")[0].strip() for linha in linhas]
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="MaxPedido - Consulta ao catálogo de fotos")
+	parser.add_argument("--json", action="store_true", help="Saída em JSON")
+	subparsers = parser.add_subparsers(dest="comando", required=True)
+
+	produto = subparsers.add_parser("produto", help="Histórico de publicações de um produto")
+	produto.add_argument("codigo", help="Código do produto (nome do arquivo sem extensão)")
+	produto.add_argument("--limite", type=int, default=20)
+
+	recentes = subparsers.add_parser("recentes", help="Últimas publicações")
+	recentes.add_argument("--desde", type=datetime.fromisoformat, help="Data/hora inicial (AAAA-MM-DD[THH:MM])")
+	recentes.add_argument("--limite", type=int, default=50)
+
+	pendentes = subparsers.add_parser("pendentes-api", help="Publicações sem confirmação da API")
+	pendentes.add_argument("--limite", type=int, default=100)
+
+	sem_foto = subparsers.add_parser("sem-foto", help="Produtos de uma lista que nunca tiveram foto publicada")
+	sem_foto.add_argument("arquivo", help="Arquivo com um código por linha (ou - para a entrada padrão)")
+
+	args = parser.parse_args()
+
+	if args.comando == "produto":
+		_imprimir(catalog_service.historico(args.codigo, args.limite), args.json)
+	elif args.comando == "recentes":
+		_imprimir(catalog_service.recentes(args.desde, args.limite), args.json)
+	elif args.comando == "pendentes-api":
+		_imprimir(catalog_service.pendentes_api(args.limite), args.json)
+	elif args.comando == "sem-foto":
+		faltantes = catalog_service.produtos_sem_foto(_ler_produtos(args.arquivo))
+		if args.json:
+			print(json.dumps(faltantes, ensure_ascii=False))
+		else:
+			print("\n".join(faltantes) if faltantes else "Todos os produtos informados têm foto.")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -24,26 +24,39 @@ DESTINO = Path(os.getenv("DEST_DIR", ""))
 if not DESTINO or str(DESTINO) == ".":
 	raise ValueError("DEST_DIR não configurado. Configure no arquivo .env")
 
-DESTINO.mkdir(exist_ok=True, parents=True)
-
 # API externa
 API_BASE_URL = os.getenv("API_BASE_URL", "")
 API_ENABLED = os.getenv("API_ENABLED", "true").strip().lower() in {"1", "true", "yes", "on"}
 API_TIMEOUT = int(os.getenv("API_TIMEOUT", "15"))
+API_WORKERS = int(os.getenv("API_WORKERS", "8"))
+API_RETRIES = int(os.getenv("API_RETRIES", "3"))
+OUTBOX_LOTE = int(os.getenv("OUTBOX_LOTE", "100"))
+# Falhas seguidas até a notificação ser descartada da outbox (4xx definitivo descarta na hora)
+OUTBOX_MAX_TENTATIVAS = int(os.getenv("OUTBOX_MAX_TENTATIVAS", "10"))
 
 # Logging
 LOG_DIR = PROJECT_ROOT / "logs"
-LOG_DIR.mkdir(exist_ok=True, parents=True)
 APP_LOG_PATH = LOG_DIR / os.getenv("APP_LOG_FILE", "app.log")
 PHOTOS_LOG_PATH = LOG_DIR / os.getenv("PHOTOS_LOG_FILE", "photos.log")
 LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", "2097152"))  # 2 MB
 LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "3"))
+# Logging em fila: o processamento só enfileira; uma thread grava, rotaciona e escreve no console
+LOG_ASYNC = os.getenv("LOG_ASYNC", "false").strip().lower() in {"1", "true", "yes", "on"}
+
+# Métricas por etapa: json, prometheus, ambos ou nenhum; METRICS_DIR vazio = LOG_DIR
+METRICS_FORMAT = os.getenv("METRICS_FORMAT", "json")
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+
+# Catálogo estruturado das fotos publicadas (logs/catalogo.db), consultado pelo catalogo.py
+CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "true").strip().lower() in {"1", "true", "yes", "on"}
 
 # Telegram Bot
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
 TELEGRAM_ENABLED = os.getenv("TELEGRAM_ENABLED", "true").strip().lower() in {"1", "true", "yes", "on"}
 TELEGRAM_TIMEOUT = int(os.getenv("TELEGRAM_TIMEOUT", "10"))
+# Intervalo mínimo entre edições da mensagem de progresso (segundos); 0 desliga o progresso
+TELEGRAM_PROGRESS_INTERVAL = int(os.getenv("TELEGRAM_PROGRESS_INTERVAL", "15"))
 
 # Configurações de Processamento de Imagens
 IMAGE_MAX_WIDTH = int(os.getenv("IMAGE_MAX_WIDTH", "225"))
@@ -52,6 +65,60 @@ IMAGE_QUALITY_MIN = int(os.getenv("IMAGE_QUALITY_MIN", "10"))
 IMAGE_MAX_SIZE_KB = int(os.getenv("IMAGE_MAX_SIZE_KB", "100"))
 IMAGE_COMPRESSION_STEP = int(os.getenv("IMAGE_COMPRESSION_STEP", "5"))
 IMAGE_MAX_ITERATIONS = int(os.getenv("IMAGE_MAX_ITERATIONS", "12"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "1"))
+IMAGE_BACKUP_ENABLED = os.getenv("IMAGE_BACKUP_ENABLED", "true").strip().lower() in {"1", "true", "yes", "on"}
+IMAGE_SKIP_UNCHANGED = os.getenv("IMAGE_SKIP_UNCHANGED", "true").strip().lower() in {"1", "true", "yes", "on"}
+IMAGE_RENDITIONS = os.getenv("IMAGE_RENDITIONS", "")
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "jpeg")
+IMAGE_DUAL_WRITE = os.getenv("IMAGE_DUAL_WRITE", "")
+
+# Detecção de arquivos ainda em cópia na origem
+READINESS_ESTAVEL_SEGUNDOS = float(os.getenv("READINESS_ESTAVEL_SEGUNDOS", "2"))
+READINESS_MAX_ESPERA = int(os.getenv("READINESS_MAX_ESPERA", "60"))
 
 # Configurações de Lock File
-LOCK_TIMEOUT = int(os.getenv("LOCK_TIMEOUT", "5"))
\ No newline at end of file
+# Com outra instância rodando: pular, esperar ou drenar (pede que ela termine o que está em andamento)
+LOCK_POLICY = os.getenv("LOCK_POLICY", "pular")
+LOCK_TIMEOUT = int(os.getenv("LOCK_TIMEOUT", "5"))
+
+# Varredura da origem
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "8"))
+
+# Pipeline varredura → processamento
+PIPELINE_STREAMING = os.getenv("PIPELINE_STREAMING", "false").strip().lower() in {"1", "true", "yes", "on"}
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "256"))
+
+# Modo contínuo (python main.py --watch)
+WATCH_DEBOUNCE_SECONDS = float(os.getenv("WATCH_DEBOUNCE_SECONDS", "3"))
+WATCH_RECONCILIACAO_MINUTOS = int(os.getenv("WATCH_RECONCILIACAO_MINUTOS", "30"))
+WATCH_POLLING = os.getenv("WATCH_POLLING", "false").strip().lower() in {"1", "true", "yes", "on"}
+WATCH_POLLING_INTERVALO = int(os.getenv("WATCH_POLLING_INTERVALO", "5"))
+
+# Modo agendado (--daemon): ciclos de processamento no mesmo processo
+SCHEDULE_INTERVAL_MINUTES = float(os.getenv("SCHEDULE_INTERVAL_MINUTES", "5"))
+# Expressão cron de 5 campos (minuto hora dia mês dia-da-semana); se preenchida, substitui o intervalo
+SCHEDULE_CRON = os.getenv("SCHEDULE_CRON", "")
+# Ciclos perdidos por um ciclo demorado: executar (um só, imediato) ou pular
+SCHEDULE_MISSED = os.getenv("SCHEDULE_MISSED", "executar").strip().lower()
+# Notificação "serviço executado" no Telegram durante o modo agendado (vazio desliga)
+SCHEDULE_NOTIFICATION_CRON = os.getenv("SCHEDULE_NOTIFICATION_CRON", "0 * * * *")
+# Reconciliação origem × destino no modo agendado (cron; vazio desliga), ex.: "30 2 * * *"
+SCHEDULE_RECONCILE_CRON = os.getenv("SCHEDULE_RECONCILE_CRON", "")
+
+# Índice incremental da varredura da origem
+SCAN_INDEX_ENABLED = os.getenv("SCAN_INDEX_ENABLED", "false").strip().lower() in {"1", "true", "yes", "on"}
+SCAN_INDEX_REVALIDAR_HORAS = int(os.getenv("SCAN_INDEX_REVALIDAR_HORAS", "24"))
+# Com o índice, encerra a execução pontual logo no início se nenhum diretório da origem mudou
+SCAN_PRECHECK = os.getenv("SCAN_PRECHECK", "true").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def criar_diretorios() -> None:
+	"""
+	Cria o destino e a pasta de logs.
+
+	Fica fora do import do config para que uma execução sem trabalho (ver
+	services/precheck_service.py) não toque o sistema de arquivos além do necessário.
+	"""
+	DESTINO.mkdir(exist_ok=True, parents=True)
+	LOG_DIR.mkdir(exist_ok=True, parents=True)
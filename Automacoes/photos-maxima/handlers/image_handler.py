@@ -1,12 +1,61 @@
+import threading
+import time
 from pathlib import Path
+from typing import Dict, List
 from watchdog.events import FileSystemEventHandler
-from services.image_service import copiar_imagem
 from services.logging_service import get_app_logger
 
 logger = get_app_logger()
 
 class Handler(FileSystemEventHandler):
+	"""
+	Agrupa os eventos de arquivo da origem por caminho.
+
+	Criações, modificações e renomeações do mesmo arquivo são coalescidas; o caminho só
+	é liberado por `coletar_prontos` depois de ficar `debounce` segundos sem novos
+	eventos (ex.: ao final de uma cópia pela rede, que gera vários "modified").
+	"""
+
+	def __init__(self, debounce: float):
+		super().__init__()
+		self.debounce = debounce
+		self._pendentes: Dict[Path, float] = {}
+		self._lock = threading.Lock()
+
+	def _registrar(self, caminho) -> None:
+		path = Path(caminho)
+		with self._lock:
+			self._pendentes[path] = time.monotonic()
+
 	def on_created(self, event):
 		if not event.is_directory:
 			logger.info(f"Novo arquivo detectado: {event.src_path}")
-			copiar_imagem(Path(event.src_path))
+			self._registrar(event.src_path)
+
+	def on_modified(self, event):
+		if not event.is_directory:
+			self._registrar(event.src_path)
+
+	def on_moved(self, event):
+		if not event.is_directory:
+			with self._lock:
+				self._pendentes.pop(Path(event.src_path), None)
+			self._registrar(event.dest_path)
+
+	def on_deleted(self, event):
+		if not event.is_directory:
+			with self._lock:
+				self._pendentes.pop(Path(event.src_path), None)
+
+	def coletar_prontos(self) -> List[Path]:
+		"""Retira e devolve os caminhos sem eventos há pelo menos `debounce` segundos."""
+		limite = time.monotonic() - self.debounce
+		with self._lock:
+			prontos = [path for path, ultimo in self._pendentes.items() if ultimo <= limite]
+			for path in prontos:
+				del self._pendentes[path]
+		return prontos
+
+	def pendentes(self) -> int:
+		with self._lock:
+			return len(self._pendentes)
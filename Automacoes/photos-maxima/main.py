@@ -1,23 +1,62 @@
 ﻿import sys
 import atexit
+import argparse
 from datetime import datetime
 
-from services.monitor_service import monitorar
-from config import SOURCE_DIR, DESTINO, TELEGRAM_ENABLED
+from config import SOURCE_DIR, TELEGRAM_ENABLED, TELEGRAM_PROGRESS_INTERVAL, LOCK_POLICY, criar_diretorios
 from services.logging_service import get_app_logger
-from services.telegram_service import TelegramService
 from services.lock_service import criar_lock, remover_lock
+from services.precheck_service import verificar_trabalho
 
 if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="MaxPedido - Monitor de Imagens")
+	parser.add_argument(
+		"--watch",
+		action="store_true",
+		help="Monitora a origem continuamente (modo daemon) até Ctrl+C",
+	)
+	parser.add_argument(
+		"--daemon",
+		action="store_true",
+		help="Roda o processamento em ciclos agendados no mesmo processo (SCHEDULE_*) até Ctrl+C",
+	)
+	parser.add_argument(
+		"--reconciliar",
+		action="store_true",
+		help="Compara a origem inteira com o destino e processa só as fotos faltantes ou desatualizadas",
+	)
+	args = parser.parse_args()
+	if args.watch + args.daemon + args.reconciliar > 1:
+		parser.error("use apenas um entre --watch, --daemon e --reconciliar")
+
+	# Execução pontual sem nada novo na origem: encerra antes de carregar o
+	# processamento de imagens, obter o lock ou falar com o Telegram. Só no console:
+	# os arquivos de log nem chegam a ser abertos
+	if not (args.watch or args.daemon or args.reconciliar):
+		precisa_rodar, motivo = verificar_trabalho()
+		if not precisa_rodar:
+			print(f"{datetime.now():%Y-%m-%d %H:%M:%S} | INFO | NADA A PROCESSAR ({motivo})")
+			sys.exit(0)
+
 	logger = get_app_logger()
+
+	criar_diretorios()
 	
-	# Criar lock file e garantir execução única
+	# Obter o lock e garantir execução única (LOCK_POLICY define o que fazer se houver outra instância)
 	if not criar_lock():
-		logger.error("Não foi possível criar lock file. Outra instância pode estar rodando.")
+		if LOCK_POLICY.strip().lower() == "pular":
+			sys.exit(0)
+		logger.error("Não foi possível obter o lock. Outra instância continua rodando.")
 		sys.exit(1)
 	
-	# Garantir que o lock seja removido ao sair
+	# Garantir que o lock seja liberado ao sair
 	atexit.register(remover_lock)
+
+	# Importados só aqui: Pillow e requests custam mais que uma execução sem trabalho
+	from services.metrics_service import finalizar_execucao
+	from services.monitor_service import monitorar
+	from services.outbox_service import reenviar_pendentes
+	from services.telegram_service import ProgressoTelegram, TelegramService
 	
 	dir_origem = str(SOURCE_DIR).strip()
 
@@ -36,9 +75,10 @@ if __name__ == "__main__":
 
 	# Enviar mensagem inicial no Telegram
 	message_id_inicial = None
+	progresso = None
+	telegram_service = TelegramService() if TELEGRAM_ENABLED else None
 	if TELEGRAM_ENABLED:
 		try:
-			telegram_service = TelegramService()
 			mensagem_inicial = (
 				f"🤖 <b>MaxPedido -Monitor de Imagenss</b>\n\n"
 				f"🕐 Iniciado em: {data_inicio_str}"
@@ -46,6 +86,9 @@ if __name__ == "__main__":
 			message_id_inicial = telegram_service.enviar_mensagem(mensagem_inicial)
 			if not message_id_inicial:
 				logger.error("Falha ao enviar mensagem inicial para o Telegram.")
+			elif TELEGRAM_PROGRESS_INTERVAL > 0 and not (args.watch or args.daemon):
+				# A mensagem inicial passa a mostrar o andamento, editada em segundo plano
+				progresso = ProgressoTelegram(telegram_service, message_id_inicial, mensagem_inicial)
 		except Exception as exc:
 			logger.error(f"Erro ao enviar mensagem inicial: {exc}")
 
@@ -54,7 +97,20 @@ if __name__ == "__main__":
 	mensagem_erro = None
 	imagens_processadas = 0
 	try:
-		imagens_processadas = monitorar(dir_origem)
+		# Notificações à API que falharam em execuções anteriores
+		reenviar_pendentes()
+
+		if args.watch:
+			from services.watch_service import monitorar_continuamente
+			imagens_processadas = monitorar_continuamente(dir_origem)
+		elif args.daemon:
+			from services.daemon_service import executar_agendado
+			imagens_processadas = executar_agendado(dir_origem)
+		elif args.reconciliar:
+			from services.reconcile_service import reconciliar
+			imagens_processadas = reconciliar(dir_origem, progresso=progresso.atualizar if progresso else None)
+		else:
+			imagens_processadas = monitorar(dir_origem, progresso=progresso.atualizar if progresso else None)
 	except KeyboardInterrupt:
 		logger.error("Processamento interrompido pelo usuário (Ctrl+C)")
 		erro_ocorrido = True
@@ -75,10 +131,15 @@ if __name__ == "__main__":
 		data_fim = datetime.now()
 		data_fim_str = data_fim.strftime('%d/%m/%Y %H:%M:%S')
 
+		# Exporta as métricas da execução e guarda o resumo por etapa para o Telegram
+		resumo_etapas = finalizar_execucao()
+
+		if progresso is not None:
+			progresso.encerrar()
+
 		# Deletar mensagem inicial e enviar mensagem final
 		if TELEGRAM_ENABLED and message_id_inicial:
 			try:
-				telegram_service = TelegramService()
 				# Deletar mensagem inicial
 				if not telegram_service.deletar_mensagem(message_id_inicial):
 					logger.error("Falha ao deletar mensagem inicial.")
@@ -100,12 +161,14 @@ if __name__ == "__main__":
 						f"🕐 Finalizado em: {data_fim_str}\n"
 						f"🖼️ Imagens processadas: {imagens_processadas}"
 					)
+				if resumo_etapas:
+					mensagem_final += "\n\n⏱️ <b>Tempo por etapa</b>\n" + "\n".join(resumo_etapas)
 				if not telegram_service.enviar_mensagem(mensagem_final):
 					logger.error("Falha ao enviar mensagem final para o Telegram.")
 			except Exception as exc:
 				logger.error(f"Erro ao processar mensagens finais: {exc}")
 
-		# Remover lock file antes de sair
+		# Liberar o lock antes de sair
 		remover_lock()
 		
 		if erro_ocorrido:
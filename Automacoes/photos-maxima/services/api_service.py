@@ -1,10 +1,199 @@
-import requests
+import math
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from config import API_BASE_URL, API_ENABLED, API_TIMEOUT
+from typing import Callable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import API_BASE_URL, API_ENABLED, API_TIMEOUT, API_WORKERS, API_RETRIES
+from services import metrics_service
 from services.logging_service import get_app_logger
 
 logger = get_app_logger()
 
+_STATUS_SUCESSO = (200, 201, 204)
+# 4xx que podem dar certo numa nova tentativa; os demais são rejeição definitiva
+_STATUS_4XX_TRANSITORIOS = (408, 425, 429)
+_BACKOFF_BASE = 0.5
+
+
+def _percentil(valores: List[float], percentil: float) -> float:
+	"""Percentil pelo método do rank mais próximo (valores já ordenados)."""
+	if not valores:
+		return 0.0
+	indice = max(0, min(len(valores) - 1, math.ceil(percentil / 100 * len(valores)) - 1))
+	return valores[indice]
+
+
+class ClienteApi:
+	"""
+	Cliente da API de fotos de produto.
+
+	Usa uma única Session com pool de conexões (keep-alive, sem novo handshake TLS por
+	foto) e despacha as chamadas em um pool limitado de threads, fora do caminho de
+	codificação. Erros 5xx/429 e timeouts são repetidos com backoff exponencial com jitter.
+	"""
+
+	def __init__(self, workers: int = API_WORKERS, tentativas: int = API_RETRIES):
+		self.workers = max(1, workers)
+		self.tentativas = max(1, tentativas)
+		self._session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+		self._session.mount("https://", adapter)
+		self._session.mount("http://", adapter)
+		self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ApiWorker")
+		# Limita as chamadas enfileiradas para não acumular memória se a API ficar lenta
+		self._vagas = threading.BoundedSemaphore(self.workers * 8)
+		self._lock = threading.Lock()
+		self._pendentes: set = set()
+		# Produtos recusados pela API com 4xx definitivo (ex.: 404, produto inexistente)
+		self._rejeitados: set = set()
+		self._latencias: List[float] = []
+		self._sucessos = 0
+		self._falhas = 0
+
+	def atualizar_foto(self, product_id: str) -> bool:
+		"""Notifica a API (de forma síncrona) que a foto do produto foi atualizada."""
+		url = f"{API_BASE_URL}/{product_id}/photo"
+
+		for tentativa in range(1, self.tentativas + 1):
+			ultima = tentativa == self.tentativas
+			inicio = time.perf_counter()
+			try:
+				response = self._session.put(url, timeout=API_TIMEOUT)
+			except (requests.Timeout, requests.ConnectionError) as e:
+				self._registrar_latencia(time.perf_counter() - inicio)
+				if ultima:
+					logger.error(f"Erro ao tentar atualizar produto {product_id} na API: {e}")
+					return self._registrar_resultado(False)
+				self._aguardar_backoff(tentativa)
+				continue
+			except Exception as e:
+				logger.error(f"Erro ao tentar atualizar produto {product_id} na API: {e}")
+				return self._registrar_resultado(False)
+
+			self._registrar_latencia(time.perf_counter() - inicio)
+			if response.status_code in _STATUS_SUCESSO:
+				return self._registrar_resultado(True)
+
+			if (response.status_code >= 500 or response.status_code == 429) and not ultima:
+				self._aguardar_backoff(tentativa)
+				continue
+
+			logger.error(f"Erro API p/ produto {product_id}: Status {response.status_code} - {response.text}")
+			if 400 <= response.status_code < 500 and response.status_code not in _STATUS_4XX_TRANSITORIOS:
+				with self._lock:
+					self._rejeitados.add(product_id)
+			return self._registrar_resultado(False)
+
+		return self._registrar_resultado(False)
+
+	def rejeitado(self, product_id: str) -> bool:
+		"""True se a última falha do produto foi uma rejeição definitiva (consome a marca)."""
+		with self._lock:
+			if product_id in self._rejeitados:
+				self._rejeitados.discard(product_id)
+				return True
+			return False
+
+	def enviar(self, product_id: str, ao_concluir: Optional[Callable[[bool], None]] = None) -> Future:
+		"""
+		Agenda a notificação do produto no pool de threads.
+
+		Args:
+			product_id: Código do produto (nome do arquivo sem extensão)
+			ao_concluir: Chamado no worker com o resultado (True/False)
+		"""
+		self._vagas.acquire()
+
+		def _executar() -> bool:
+			try:
+				ok = self.atualizar_foto(product_id)
+				if ao_concluir is not None:
+					try:
+						ao_concluir(ok)
+					except Exception as exc:
+						logger.warning(f"Erro no retorno da API do produto {product_id}: {exc}")
+				return ok
+			finally:
+				self._vagas.release()
+
+		futuro = self._executor.submit(_executar)
+		with self._lock:
+			self._pendentes.add(futuro)
+		futuro.add_done_callback(self._descartar)
+		return futuro
+
+	def aguardar(self) -> None:
+		"""Aguarda todas as notificações agendadas terminarem."""
+		while True:
+			with self._lock:
+				pendentes = list(self._pendentes)
+			if not pendentes:
+				return
+			for futuro in pendentes:
+				try:
+					futuro.result()
+				except Exception:
+					pass
+
+	def resumo(self, reiniciar: bool = True) -> Optional[str]:
+		"""Texto com volume e percentis de latência desde o último resumo (None se não houve chamadas)."""
+		with self._lock:
+			latencias = sorted(self._latencias)
+			sucessos, falhas = self._sucessos, self._falhas
+			if reiniciar:
+				self._latencias.clear()
+				self._sucessos = 0
+				self._falhas = 0
+
+		if not latencias:
+			return None
+		return (
+			f"API: {sucessos} ok, {falhas} falha(s), {len(latencias)} requisições | latência "
+			f"p50={_percentil(latencias, 50) * 1000:.0f}ms "
+			f"p95={_percentil(latencias, 95) * 1000:.0f}ms "
+			f"p99={_percentil(latencias, 99) * 1000:.0f}ms"
+		)
+
+	def _descartar(self, futuro: Future) -> None:
+		with self._lock:
+			self._pendentes.discard(futuro)
+
+	def _registrar_latencia(self, segundos: float) -> None:
+		with self._lock:
+			self._latencias.append(segundos)
+		metrics_service.registrar("api", segundos)
+
+	def _registrar_resultado(self, ok: bool) -> bool:
+		with self._lock:
+			if ok:
+				self._sucessos += 1
+			else:
+				self._falhas += 1
+		return ok
+
+	def _aguardar_backoff(self, tentativa: int) -> None:
+		time.sleep(_BACKOFF_BASE * 2 ** (tentativa - 1) * random.uniform(0.5, 1.5))
+
+
+_cliente: Optional[ClienteApi] = None
+_cliente_lock = threading.Lock()
+
+
+def obter_cliente() -> ClienteApi:
+	"""Cliente compartilhado pelo processo (mantém as conexões entre as chamadas)."""
+	global _cliente
+	with _cliente_lock:
+		if _cliente is None:
+			_cliente = ClienteApi()
+		return _cliente
+
+
 def enviar_imagem_api(caminho_imagem: Path):
 	"""
 	Atualiza via API usando o nome do arquivo (sem extensão) como product_id na URL
@@ -12,18 +201,20 @@ def enviar_imagem_api(caminho_imagem: Path):
 	if not API_ENABLED:
 		return False
 
-	product_id = caminho_imagem.stem
-	url = f"{API_BASE_URL}/{product_id}/photo"
+	return obter_cliente().atualizar_foto(caminho_imagem.stem)
 
-	try:
-		response = requests.put(url, timeout=API_TIMEOUT)
 
-		if response.status_code in (200, 201, 204):
-			return True
-		else:
-			logger.error(f"Erro API p/ produto {product_id}: Status {response.status_code} - {response.text}")
-			return False
+def enviar_imagem_api_async(caminho_imagem: Path, ao_concluir: Optional[Callable[[bool], None]] = None) -> Optional[Future]:
+	"""Agenda a atualização na API sem bloquear quem chama; None se a API está desabilitada."""
+	if not API_ENABLED:
+		return None
 
-	except Exception as e:
-		logger.error(f"Erro ao tentar atualizar produto {product_id} na API: {e}")
-		return False
+	return obter_cliente().enviar(caminho_imagem.stem, ao_concluir)
+
+
+def finalizar_envios() -> Optional[str]:
+	"""Aguarda as chamadas pendentes e devolve o resumo de latência da execução."""
+	if _cliente is None:
+		return None
+	_cliente.aguardar()
+	return _cliente.resumo()
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+"""
+Catálogo estruturado das fotos publicadas no destino.
+
+Cada arquivo gravado no destino (imagem principal, formato duplicado e rendições) vira
+uma linha com produto, origem, hash da origem, tamanho, dimensões, qualidade usada,
+tempo de processamento e situação da notificação à API. Ao contrário do photos.log, o
+histórico não se perde na rotação e pode ser consultado por produto (ver `catalogo.py`).
+
+Gravações acontecem apenas no processo principal.
+"""
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from config import LOG_DIR
+from services.logging_service import get_app_logger
+from utils.db_utils import abrir_banco
+
+logger = get_app_logger()
+CATALOG_FILE = LOG_DIR / "catalogo.db"
+
+API_PENDENTE = "pendente"
+API_OK = "ok"
+API_FALHA = "falha"
+API_DESABILITADA = "desabilitada"
+
+_conexao = None
+_lock = threading.Lock()
+
+
+@dataclass
+class SaidaImagem:
+	"""Um arquivo publicado no destino para a imagem de origem."""
+	destino: Path
+	formato: str
+	tamanho_bytes: int
+	largura: int
+	altura: int
+	qualidade: int
+
+
+def _obter_conexao():
+	global _conexao
+	if _conexao is None:
+		_conexao = abrir_banco(CATALOG_FILE)
+		_conexao.executescript(
+			"""
+			CREATE TABLE IF NOT EXISTS publicacoes (
+				id INTEGER PRIMARY KEY AUTOINCREMENT,
+				produto TEXT NOT NULL,
+				destino TEXT NOT NULL,
+				formato TEXT NOT NULL,
+				origem TEXT NOT NULL,
+				hash_origem TEXT NOT NULL,
+				tamanho_bytes INTEGER NOT NULL,
+				largura INTEGER NOT NULL,
+				altura INTEGER NOT NULL,
+				qualidade INTEGER NOT NULL,
+				tempo_ms REAL NOT NULL,
+				api_status TEXT NOT NULL,
+				atualizado_em TEXT NOT NULL
+			);
+			CREATE INDEX IF NOT EXISTS idx_publicacoes_produto ON publicacoes (produto, atualizado_em);
+			CREATE INDEX IF NOT EXISTS idx_publicacoes_data ON publicacoes (atualizado_em);
+			"""
+		)
+		_conexao.commit()
+	return _conexao
+
+
+def registrar(
+	produto: str,
+	origem: Path,
+	hash_origem: str,
+	saidas: Iterable[SaidaImagem],
+	tempo_ms: float,
+	api_status: str,
+) -> None:
+	"""Acrescenta ao catálogo os arquivos publicados para o produto."""
+	agora = datetime.now().isoformat(timespec="seconds")
+	try:
+		with _lock:
+			conexao = _obter_conexao()
+			with conexao:
+				conexao.executemany(
+					"INSERT INTO publicacoes (produto, destino, formato, origem, hash_origem, tamanho_bytes, "
+					"largura, altura, qualidade, tempo_ms, api_status, atualizado_em) "
+					"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+					(
+						(
+							produto, str(saida.destino), saida.formato, str(origem), hash_origem,
+							saida.tamanho_bytes, saida.largura, saida.altura, saida.qualidade,
+							round(tempo_ms, 1), api_status, agora,
+						)
+						for saida in saidas
+					),
+				)
+	except Exception as exc:
+		logger.warning(f"Não foi possível registrar {produto} no catálogo: {exc}")
+
+
+def atualizar_api(produto: str, api_ok: bool) -> None:
+	"""Atualiza a situação da API nas publicações do produto ainda não confirmadas."""
+	try:
+		with _lock:
+			conexao = _obter_conexao()
+			with conexao:
+				if api_ok:
+					conexao.execute(
+						"UPDATE publicacoes SET api_status = ? WHERE produto = ? AND api_status IN (?, ?)",
+						(API_OK, produto, API_PENDENTE, API_FALHA),
+					)
+				else:
+					conexao.execute(
+						"UPDATE publicacoes SET api_status = ? WHERE produto = ? AND api_status = ?",
+						(API_FALHA, produto, API_PENDENTE),
+					)
+	except Exception as exc:
+		logger.warning(f"Não foi possível atualizar a situação da API de {produto} no catálogo: {exc}")
+
+
+def historico(produto: str, limite: int = 20) -> List[dict]:
+	"""Publicações do produto, da mais recente para a mais antiga."""
+	with _lock:
+		cursor = _obter_conexao().execute(
+			"SELECT * FROM publicacoes WHERE produto = ? ORDER BY atualizado_em DESC, id DESC LIMIT ?",
+			(produto, limite),
+		)
+		colunas = [descricao[0] for descricao in cursor.description]
+		return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
+
+def recentes(desde: Optional[datetime] = None, limite: int = 50) -> List[dict]:
+	"""Últimas publicações (opcionalmente a partir de uma data)."""
+	with _lock:
+		cursor = _obter_conexao().execute(
+			"SELECT * FROM publicacoes WHERE atualizado_em >= ? ORDER BY atualizado_em DESC, id DESC LIMIT ?",
+			((desde or datetime.min).isoformat(timespec="seconds"), limite),
+		)
+		colunas = [descricao[0] for descricao in cursor.description]
+		return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
+
+def pendentes_api(limite: int = 100) -> List[dict]:
+	"""Publicações cuja notificação à API ainda não foi confirmada."""
+	with _lock:
+		cursor = _obter_conexao().execute(
+			"SELECT * FROM publicacoes WHERE api_status IN (?, ?) ORDER BY atualizado_em DESC, id DESC LIMIT ?",
+			(API_PENDENTE, API_FALHA, limite),
+		)
+		colunas = [descricao[0] for descricao in cursor.description]
+		return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
+
+def produtos_sem_foto(produtos: Iterable[str]) -> List[str]:
+	"""Dos produtos informados, os que nunca tiveram foto publicada."""
+	produtos = list(dict.fromkeys(produto.strip() for produto in produtos if produto.strip()))
+	with _lock:
+		conexao = _obter_conexao()
+		conexao.execute("CREATE TEMP TABLE IF NOT EXISTS consulta_produtos (produto TEXT PRIMARY KEY)")
+		conexao.execute("DELETE FROM consulta_produtos")
+		conexao.executemany("INSERT OR IGNORE INTO consulta_produtos (produto) VALUES (?)", ((p,) for p in produtos))
+		linhas = conexao.execute(
+			"SELECT c.produto FROM consulta_produtos c "
+			"WHERE NOT EXISTS (SELECT 1 FROM publicacoes p WHERE p.produto = c.produto) ORDER BY c.produto"
+		).fetchall()
+		conexao.rollback()
+	return [linha[0] for linha in linhas]
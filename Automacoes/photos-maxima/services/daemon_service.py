@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+"""
+Modo agendado (daemon): o processamento pontual roda em ciclos dentro do mesmo processo.
+
+Em vez de o agendador do sistema operacional abrir um processo novo a cada ciclo
+(inicialização do interpretador, imports do Pillow/requests, leitura do .env, lock,
+mensagem inicial no Telegram), um único processo mantém o lock e roda `monitorar`
+pelo `SchedulerService`, com o pool de transcodificação, a sessão da API e as conexões
+do manifesto/índice/catálogo já abertas entre um ciclo e outro.
+"""
+
+import threading
+
+from config import (
+	SCAN_INDEX_ENABLED, SCHEDULE_CRON, SCHEDULE_INTERVAL_MINUTES, SCHEDULE_MISSED, SCHEDULE_NOTIFICATION_CRON,
+	SCHEDULE_RECONCILE_CRON,
+)
+from services.lock_service import drenagem_solicitada
+from services.index_service import IndiceArquivos
+from services.logging_service import get_app_logger
+from services.metrics_service import finalizar_execucao, iniciar_execucao
+from services.monitor_service import monitorar
+from services.outbox_service import reenviar_pendentes
+from services.pipeline_service import ProcessadorImagens
+from services.reconcile_service import reconciliar
+from services.scheduler_service import SchedulerService
+
+logger = get_app_logger()
+
+
+def executar_agendado(diretorio: str) -> int:
+	"""
+	Roda os ciclos de processamento até Ctrl+C ou até outra instância pedir drenagem.
+
+	Returns:
+		Quantidade de imagens processadas em todos os ciclos
+	"""
+	processadas = 0
+	ciclos = 0
+	lock_contadores = threading.Lock()
+	# Lido do disco no primeiro ciclo; os seguintes reaproveitam o índice em memória
+	indice = IndiceArquivos() if SCAN_INDEX_ENABLED else None
+
+	with ProcessadorImagens() as processador:
+
+		def _ciclo() -> None:
+			nonlocal processadas, ciclos
+			# Histogramas por ciclo, como numa execução pontual
+			iniciar_execucao()
+			# Notificações que falharam no ciclo anterior (antes do primeiro, o main.py já reenviou)
+			if ciclos:
+				reenviar_pendentes()
+			quantidade = monitorar(diretorio, processador=processador, indice=indice)
+			with lock_contadores:
+				processadas += quantidade
+				ciclos += 1
+			finalizar_execucao()
+
+		def _reconciliacao() -> None:
+			nonlocal processadas
+			iniciar_execucao()
+			quantidade = reconciliar(diretorio, processador=processador)
+			with lock_contadores:
+				processadas += quantidade
+			finalizar_execucao()
+
+		agendador = SchedulerService()
+		if SCHEDULE_CRON.strip():
+			agendador.adicionar_cron("monitorar", SCHEDULE_CRON.strip(), _ciclo, SCHEDULE_MISSED)
+		else:
+			agendador.adicionar_intervalo("monitorar", SCHEDULE_INTERVAL_MINUTES * 60, _ciclo, SCHEDULE_MISSED)
+		if SCHEDULE_RECONCILE_CRON.strip():
+			# Sem fila de execuções perdidas: a próxima reconciliação cobre o mesmo
+			agendador.adicionar_cron("reconciliar", SCHEDULE_RECONCILE_CRON.strip(), _reconciliacao, "pular")
+		if SCHEDULE_NOTIFICATION_CRON.strip():
+			agendador.agendar_notificacao(SCHEDULE_NOTIFICATION_CRON.strip())
+
+		logger.info("MODO AGENDADO INICIADO")
+		try:
+			agendador.executar(deve_parar=drenagem_solicitada)
+		except KeyboardInterrupt:
+			# Como no modo contínuo, Ctrl+C é a forma normal de encerrar; um ciclo
+			# interrompido retoma pelo diário de execução
+			logger.info("Modo agendado interrompido pelo usuário")
+		finally:
+			logger.info(f"MODO AGENDADO ENCERRADO: {ciclos} ciclo(s), {processadas} imagem(ns) processada(s)")
+
+	if drenagem_solicitada():
+		logger.warning("Drenagem solicitada por outra instância: encerrando o modo agendado")
+	return processadas
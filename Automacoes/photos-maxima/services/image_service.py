@@ -1,110 +1,370 @@
+import hashlib
+import io
+import json
+import os
+import shutil
 import time
+import uuid
+from dataclasses import dataclass, field
 from pathlib import Path
-from PIL import Image
+from typing import Dict, List, Optional
+from PIL import Image, UnidentifiedImageError, features
 from config import (
 	DESTINO, IMAGE_MAX_WIDTH, IMAGE_QUALITY_INITIAL, IMAGE_QUALITY_MIN,
-	IMAGE_MAX_SIZE_KB, IMAGE_COMPRESSION_STEP, IMAGE_MAX_ITERATIONS
+	IMAGE_MAX_SIZE_KB, IMAGE_COMPRESSION_STEP, IMAGE_MAX_ITERATIONS,
+	IMAGE_SKIP_UNCHANGED, IMAGE_BACKUP_ENABLED, IMAGE_RENDITIONS, IMAGE_FORMAT,
+	IMAGE_DUAL_WRITE, API_ENABLED, CATALOG_ENABLED
 )
 from utils.file_utils import eh_imagem
-from services.api_service import enviar_imagem_api
+from services import catalog_service, manifest_service, metrics_service, outbox_service
+from services.api_service import enviar_imagem_api_async
+from services.catalog_service import SaidaImagem
 from services.logging_service import get_app_logger, get_photos_logger
+from services.metrics_service import cronometrar
+from services.readiness_service import ArquivoNaoPronto, RastreadorProntidao
 
 logger = get_app_logger()
 photos_logger = get_photos_logger()
 
-def esperar_arquivo_liberado(path: Path, tentativas=10, intervalo=0.5) -> bool:
-	"""Tenta acessar o arquivo para leitura até que esteja liberado (usado em rede)."""
-	for _ in range(tentativas):
-		try:
-			with open(path, "rb") as f:
-				f.read(1)
-			return True
-		except (PermissionError, OSError):
-			time.sleep(intervalo)
-	return False
-
-def copiar_imagem(path: Path):
-	if not eh_imagem(path):
-		return
+_TENTATIVAS_GRAVACAO = 12
+_prontidao = RastreadorProntidao()
+
+# Codecs de saída suportados: nome na configuração -> (extensão, formato do Pillow, opções)
+_CODECS = {
+	"jpeg": (".jpg", "JPEG", {"optimize": True, "progressive": True}),
+	"webp": (".webp", "WEBP", {"method": 4}),
+	"avif": (".avif", "AVIF", {"speed": 6}),
+}
+
+
+@dataclass(frozen=True)
+class Rendicao:
+	"""Uma versão da foto publicada no destino (subpasta vazia = raiz do DESTINO)."""
+	subpasta: str
+	largura_max: int
+	tamanho_max_kb: int
+	formato: str = "jpeg"
+
+	@property
+	def pasta(self) -> Path:
+		return DESTINO / self.subpasta
+
+	@property
+	def extensao(self) -> str:
+		return _CODECS[self.formato][0]
+
+	def destino(self, produto: str) -> Path:
+		return self.pasta / (produto + self.extensao)
+
+
+def _validar_formato(formato: str, origem: str) -> str:
+	"""Confere se o codec existe e se o Pillow instalado consegue gravá-lo."""
+	formato = formato.strip().lower()
+	if formato not in _CODECS:
+		raise ValueError(f"{origem}: formato '{formato}' não suportado (use {', '.join(_CODECS)})")
+	if formato != "jpeg":
+		Image.init()
+		if _CODECS[formato][1] not in Image.SAVE or (formato == "webp" and not features.check("webp")):
+			raise ValueError(f"{origem}: o Pillow instalado não grava {formato.upper()}")
+	return formato
+
+
+def _carregar_rendicoes() -> List[Rendicao]:
+	"""
+	Monta as rendições a partir da configuração, da maior para a menor largura.
+
+	A principal (raiz do DESTINO, IMAGE_MAX_WIDTH / IMAGE_MAX_SIZE_KB, IMAGE_FORMAT)
+	sempre existe; IMAGE_DUAL_WRITE grava a mesma imagem também em um segundo formato.
+	As extras vêm de IMAGE_RENDITIONS no formato `subpasta:largura:tamanho_kb[:formato]`,
+	separadas por vírgula (ex.: `zoom:1200:300,mini:64:8`).
+	"""
+	principal = Rendicao("", IMAGE_MAX_WIDTH, IMAGE_MAX_SIZE_KB, _validar_formato(IMAGE_FORMAT, "IMAGE_FORMAT"))
+	rendicoes = [principal]
+	if IMAGE_DUAL_WRITE.strip():
+		formato = _validar_formato(IMAGE_DUAL_WRITE, "IMAGE_DUAL_WRITE")
+		if formato != principal.formato:
+			rendicoes.append(Rendicao("", IMAGE_MAX_WIDTH, IMAGE_MAX_SIZE_KB, formato))
+
+	for item in IMAGE_RENDITIONS.split(","):
+		item = item.strip()
+		if not item:
+			continue
+		partes = [parte.strip() for parte in item.split(":")]
+		if len(partes) not in (3, 4) or not partes[0]:
+			raise ValueError(f"IMAGE_RENDITIONS inválido: '{item}' (use subpasta:largura:tamanho_kb[:formato])")
+		formato = _validar_formato(partes[3], "IMAGE_RENDITIONS") if len(partes) == 4 else principal.formato
+		rendicoes.append(Rendicao(partes[0], int(partes[1]), int(partes[2]), formato))
+
+	chaves = [(rendicao.subpasta, rendicao.formato) for rendicao in rendicoes]
+	if len(set(chaves)) != len(chaves):
+		raise ValueError("IMAGE_RENDITIONS: subpastas repetidas")
+	return sorted(rendicoes, key=lambda rendicao: rendicao.largura_max, reverse=True)
+
+
+RENDICOES = _carregar_rendicoes()
+# Imagem registrada no photos.log e notificada à API
+PRINCIPAL = next(
+	rendicao for rendicao in RENDICOES if not rendicao.subpasta and rendicao.formato == IMAGE_FORMAT.strip().lower()
+)
+
 
-	if not esperar_arquivo_liberado(path):
-		logger.error(f"Arquivo em uso após várias tentativas: {path.name}")
-		raise Exception(f"Arquivo em uso: {path.name}")
+def parametros_codificacao() -> str:
+	"""Parâmetros que, se alterados, exigem recodificar imagens já publicadas."""
+	parametros = {
+		"formato": PRINCIPAL.formato.upper(),
+		"largura_max": IMAGE_MAX_WIDTH,
+		"qualidade_inicial": IMAGE_QUALITY_INITIAL,
+		"qualidade_min": IMAGE_QUALITY_MIN,
+		"tamanho_max_kb": IMAGE_MAX_SIZE_KB,
+		"passo": IMAGE_COMPRESSION_STEP,
+	}
+	# Só entra quando configurado, para não invalidar o manifesto de quem não usa extras
+	extras = [
+		[rendicao.subpasta, rendicao.largura_max, rendicao.tamanho_max_kb, rendicao.formato]
+		for rendicao in RENDICOES if rendicao != PRINCIPAL
+	]
+	if extras:
+		parametros["rendicoes"] = extras
+	return json.dumps(parametros, sort_keys=True)
 
-	dest_file = DESTINO / (path.stem + ".jpg")
+def _decodificar(img: Image.Image, largura_max: int) -> Image.Image:
+	"""
+	Decodifica a imagem em RGB já próxima da largura final.
 
-	# Backup se já existir
-	if dest_file.exists():
-		backup_file = dest_file.with_suffix(".bkp.jpg")
+	Em JPEG o `draft` faz o decodificador usar a redução por DCT (1/2, 1/4 ou 1/8) sem
+	ficar menor que o tamanho pedido: uma foto de 24 MP é decodificada com até 64x menos
+	pixels.
+	"""
+	if img.width > largura_max:
+		altura_alvo = max(1, int(img.height * largura_max / img.width))
+		img.draft("RGB", (largura_max, altura_alvo))
+
+	return img.convert("RGB")
+
+def _decodificar_reduzida(img: Image.Image, largura_max: int) -> Image.Image:
+	"""Decodifica (ver `_decodificar`) e aplica o redimensionamento LANCZOS."""
+	return _reduzir(_decodificar(img, largura_max), largura_max)
+
+def _reduzir(img: Image.Image, largura_max: int) -> Image.Image:
+	"""
+	Reduz a imagem (já em RGB) para no máximo `largura_max`, mantendo a proporção.
+
+	O `reducing_gap` faz uma redução inteira rápida antes do filtro LANCZOS final.
+	"""
+	if img.width > largura_max:
+		proporcao = largura_max / img.width
+		nova_altura = max(1, int(img.height * proporcao))
+		img = img.resize((largura_max, nova_altura), Image.LANCZOS, reducing_gap=3.0)
+	return img
+
+def _qualidades_candidatas() -> list[int]:
+	"""Escada de qualidades da compressão: inicial, inicial - passo, ... até a mínima."""
+	qualidades = [IMAGE_QUALITY_INITIAL]
+	while len(qualidades) < IMAGE_MAX_ITERATIONS and qualidades[-1] > IMAGE_QUALITY_MIN:
+		qualidades.append(qualidades[-1] - IMAGE_COMPRESSION_STEP)
+	return qualidades
+
+def _comprimir_ate_limite(img: Image.Image, rendicao: Rendicao) -> tuple[bytes, int, int]:
+	"""
+	Busca em memória uma qualidade da escada que respeita o limite da rendição.
+
+	Faz bisseção sobre a escada de qualidades, com O(log n) codificações e sem gravar
+	tentativas no destino. A qualidade devolvida cabe no limite, mas não é necessariamente
+	a maior que caberia: isso só vale se o tamanho cair junto com a qualidade, o que JPEG
+	e WebP não garantem. Se nenhuma qualidade testada couber, usa a menor da escada (que
+	pode passar do limite).
+
+	Returns:
+		(conteúdo codificado, qualidade usada, quantidade de codificações feitas)
+	"""
+	limite = rendicao.tamanho_max_kb * 1024
+	_, formato, opcoes = _CODECS[rendicao.formato]
+	qualidades = _qualidades_candidatas()
+	codificados: dict[int, bytes] = {}
+
+	def _codificar(indice: int) -> bytes:
+		if indice not in codificados:
+			buffer = io.BytesIO()
+			img.save(buffer, format=formato, quality=qualidades[indice], **opcoes)
+			codificados[indice] = buffer.getvalue()
+		return codificados[indice]
+
+	# Caso mais comum: a qualidade inicial já cabe no limite
+	if len(_codificar(0)) <= limite:
+		return codificados[0], qualidades[0], 1
+
+	melhor = len(qualidades) - 1
+	baixo, alto = 1, len(qualidades) - 1
+	while baixo <= alto:
+		meio = (baixo + alto) // 2
+		if len(_codificar(meio)) <= limite:
+			melhor = meio
+			alto = meio - 1
+		else:
+			baixo = meio + 1
+
+	return _codificar(melhor), qualidades[melhor], len(codificados)
+
+
+def _criar_backup(dest_file: Path, backup_file: Path) -> None:
+	"""
+	Copia o arquivo atual para o backup sem tirá-lo do lugar.
+
+	Usa um hard link (sem copiar bytes) com um nome temporário e o troca pelo backup com
+	`os.replace`, substituindo o backup antigo; se o sistema de arquivos não suporta
+	links, copia o conteúdo.
+	"""
+	temporario = backup_file.with_name(f".{backup_file.stem}.{uuid.uuid4().hex[:8]}.tmp")
+	try:
+		try:
+			os.link(dest_file, temporario)
+		except FileNotFoundError:
+			# Primeira publicação: não há o que preservar
+			raise
+		except OSError:
+			shutil.copy2(dest_file, temporario)
+		os.replace(temporario, backup_file)
+	finally:
 		try:
-			# Tentar remover backup antigo se existir
-			if backup_file.exists():
-				try:
-					backup_file.unlink()
-				except (PermissionError, OSError):
-					pass  # Ignora se não conseguir remover backup antigo
-			
-			# Tentar renomear arquivo existente para backup
+			temporario.unlink(missing_ok=True)
+		except OSError:
+			pass
+
+
+def _publicar(conteudo: bytes, dest_file: Path) -> None:
+	"""
+	Publica o arquivo final no destino de forma atômica.
+
+	O conteúdo é gravado em um temporário no próprio DESTINO e trocado pelo definitivo
+	com um único `os.replace`: o app nunca vê um arquivo parcial nem fica sem o arquivo.
+	Com IMAGE_BACKUP_ENABLED, a versão anterior é antes preservada como `.bkp.<extensão>`
+	(hard link, substituindo o backup antigo), sem sair do lugar.
+	"""
+	temporario = dest_file.with_name(f".{dest_file.stem}.{uuid.uuid4().hex[:8]}.tmp")
+	backup_file = dest_file.with_suffix(".bkp" + dest_file.suffix)
+	temporario.write_bytes(conteudo)
+	try:
+		if IMAGE_BACKUP_ENABLED:
+			try:
+				_criar_backup(dest_file, backup_file)
+			except FileNotFoundError:
+				pass
+			except (PermissionError, OSError) as e:
+				logger.warning(f"Não foi possível criar backup de {dest_file.name}: {e}. Continuando...")
+
+		for tentativa in range(_TENTATIVAS_GRAVACAO):
 			try:
-				dest_file.rename(backup_file)
+				os.replace(temporario, dest_file)
+				break
 			except (PermissionError, OSError) as e:
-				# Se não conseguir renomear, tentar deletar o arquivo antigo
-				logger.warning(f"Não foi possível criar backup de {path.name}. Tentando deletar arquivo antigo...")
-				try:
-					dest_file.unlink()
-				except (PermissionError, OSError) as e2:
-					# Se não conseguir deletar, tentar sobrescrever diretamente
-					logger.warning(f"Não foi possível deletar arquivo antigo {path.name}. Tentando sobrescrever...")
-					# Continua para tentar sobrescrever
-		except Exception as e:
-			logger.warning(f"Erro ao processar backup de {path.name}: {e}. Continuando...")
-			# Não faz raise, continua o processamento
+				# Arquivo de destino em uso (ex.: sendo lido no compartilhamento); tenta novamente após um delay
+				if tentativa < _TENTATIVAS_GRAVACAO - 1:
+					logger.warning(f"Erro de acesso ao salvar {dest_file.name} (tentativa {tentativa + 1}/{_TENTATIVAS_GRAVACAO}). Aguardando...")
+					time.sleep(1)
+				else:
+					logger.error(f"Falha ao salvar {dest_file.name} após {_TENTATIVAS_GRAVACAO} tentativas: {e}")
+					raise
+	finally:
+		try:
+			temporario.unlink(missing_ok=True)
+		except OSError:
+			pass
+
+class ImagemInvalida(Exception):
+	"""O conteúdo do arquivo não pode ser decodificado (corrompido ou formato sem suporte)."""
+
+
+@dataclass
+class ResultadoImagem:
+	"""Resultado da etapa de arquivo de uma imagem (pode vir de outro processo)."""
+	origem: Path
+	destino: Path
+	tamanho_kb: int
+	hash_origem: str = ""
+	ignorado: bool = False
+	# Segundos por etapa e codificações feitas; registrados nas métricas pelo processo principal
+	tempos: Dict[str, float] = field(default_factory=dict)
+	codificacoes: int = 0
+	# Arquivos publicados (um por rendição), para o catálogo
+	saidas: List[SaidaImagem] = field(default_factory=list)
+
+
+def processar_imagem(path: Path) -> Optional[ResultadoImagem]:
+	"""
+	Etapa de arquivo: decodifica, redimensiona, comprime e grava a imagem no destino.
+
+	Não escreve no photos.log nem chama a API, para poder rodar em um processo do pool
+	(ver `registrar_imagem`).
+
+	Returns:
+		ResultadoImagem ou None se o arquivo não for uma imagem. Se o conteúdo e os
+		parâmetros coincidem com o manifesto, nada é gravado e `ignorado` vem True.
+
+	Raises:
+		ImagemInvalida: o conteúdo não pode ser decodificado; tentar de novo não adianta
+	"""
+	# Arquivos vindos da varredura já são arquivos regulares: evita um stat extra
+	if not eh_imagem(path, verificar_arquivo=False):
+		return None
+
+	produto = path.stem
+	destinos = {rendicao: rendicao.destino(produto) for rendicao in RENDICOES}
+	dest_file = destinos[PRINCIPAL]
+
+	tempos: Dict[str, float] = {}
+	codificacoes = 0
+	saidas: List[SaidaImagem] = []
+
+	# Lê a origem uma única vez: o mesmo conteúdo serve para o hash e a decodificação
+	with cronometrar(tempos, "leitura"):
+		dados = path.read_bytes()
+	with cronometrar(tempos, "hash"):
+		hash_origem = hashlib.blake2b(dados, digest_size=16).hexdigest()
+
+	if IMAGE_SKIP_UNCHANGED and manifest_service.obter_registro(produto) == (hash_origem, parametros_codificacao()):
+		if all(destino.exists() for destino in destinos.values()):
+			return ResultadoImagem(
+				origem=path, destino=dest_file, tamanho_kb=0, hash_origem=hash_origem, ignorado=True, tempos=tempos
+			)
 
 	try:
-		with Image.open(path) as img:
-			img = img.convert("RGB")
-
-			if img.width > IMAGE_MAX_WIDTH:
-				proporcao = IMAGE_MAX_WIDTH / img.width
-				nova_altura = int(img.height * proporcao)
-				img = img.resize((IMAGE_MAX_WIDTH, nova_altura), Image.LANCZOS)
-
-			qualidade = IMAGE_QUALITY_INITIAL
-			salvar_kwargs = {
-				"optimize": True,
-				"progressive": True,
-				"quality": qualidade,
-			}
-
-			# Tentar salvar a imagem
-			for tentativa in range(IMAGE_MAX_ITERATIONS):
-				try:
-					img.save(dest_file, format="JPEG", **salvar_kwargs)
-					size_kb = dest_file.stat().st_size / 1024
-
-					if size_kb <= IMAGE_MAX_SIZE_KB:
-						break
-					elif qualidade > IMAGE_QUALITY_MIN:
-						qualidade -= IMAGE_COMPRESSION_STEP
-						salvar_kwargs["quality"] = qualidade
-					else:
-						break
-				except (PermissionError, OSError) as e:
-					# Se não conseguir salvar por permissão, tenta novamente após um delay
-					if tentativa < 11:
-						logger.warning(f"Erro de acesso ao salvar {path.name} (tentativa {tentativa + 1}/12). Aguardando...")
-						time.sleep(1)
-						continue
-					else:
-						logger.error(f"Falha ao salvar {path.name} após 12 tentativas: {e}")
-						raise
-
-		size_kb_final = round(dest_file.stat().st_size / 1024)
-		photos_logger.info(dest_file.name)
-
-		# Envia notificação para API externa (opcional, conforme configuração)
-		enviar_imagem_api(dest_file)
+		# Uma única decodificação, já reduzida para a maior rendição; cada rendição
+		# seguinte é reduzida a partir da anterior (RENDICOES vem da maior para a menor)
+		# Os bytes já estão em memória: aqui um OSError é do conteúdo, não de acesso ao arquivo.
+		# O Pillow só conhece o BytesIO, então o nome do arquivo entra na mensagem aqui
+		try:
+			with cronometrar(tempos, "decodificacao"), Image.open(io.BytesIO(dados)) as img:
+				img = _decodificar(img, RENDICOES[0].largura_max)
+		except UnidentifiedImageError as e:
+			raise ImagemInvalida(f"{path.name}: formato não reconhecido") from e
+		except (Image.DecompressionBombError, OSError, SyntaxError, ValueError) as e:
+			raise ImagemInvalida(f"{path.name}: {e}") from e
 
+		conteudo = b""
+		for rendicao in RENDICOES:
+			with cronometrar(tempos, "redimensionamento"):
+				img = _reduzir(img, rendicao.largura_max)
+			with cronometrar(tempos, "compressao"):
+				codificado, qualidade, quantidade = _comprimir_ate_limite(img, rendicao)
+			codificacoes += quantidade
+			destino = destinos[rendicao]
+			with cronometrar(tempos, "gravacao_destino"):
+				if rendicao.subpasta:
+					destino.parent.mkdir(parents=True, exist_ok=True)
+				_publicar(codificado, destino)
+			saidas.append(SaidaImagem(destino, rendicao.formato, len(codificado), img.width, img.height, qualidade))
+			if rendicao == PRINCIPAL:
+				conteudo = codificado
+
+		size_kb_final = round(len(conteudo) / 1024)
+		return ResultadoImagem(
+			origem=path, destino=dest_file, tamanho_kb=size_kb_final, hash_origem=hash_origem,
+			tempos=tempos, codificacoes=codificacoes, saidas=saidas,
+		)
+
+	except ImagemInvalida as e:
+		logger.error(f"Imagem inválida: {e}")
+		raise
 	except (PermissionError, OSError) as e:
 		logger.error(f"Erro de acesso ao processar {path.name}: {e}")
 		raise
@@ -112,3 +372,64 @@ def copiar_imagem(path: Path):
 		logger.error(f"Erro ao processar {path.name}: {e}")
 		raise
 
+
+def registrar_imagem(resultado: ResultadoImagem) -> None:
+	"""Etapa do processo principal: registra a foto no photos.log e no catálogo e notifica a API."""
+	metrics_service.registrar_tempos(resultado.tempos)
+	metrics_service.contar("codificacoes", resultado.codificacoes)
+	if resultado.ignorado:
+		metrics_service.contar("imagens_ignoradas")
+		return
+
+	metrics_service.contar("imagens_processadas")
+
+	photos_logger.info(resultado.destino.name)
+
+	produto = resultado.destino.stem
+	# A foto já está publicada: a notificação entra na outbox antes do manifesto, para que
+	# uma queda entre as duas gravações nunca deixe a foto "em dia" sem aviso à API (no
+	# pior caso a imagem é recodificada e a notificação, que já está na fila, é reenviada).
+	# Sem a linha na outbox, o manifesto não é atualizado pelo mesmo motivo.
+	na_fila = outbox_service.registrar(produto) if API_ENABLED else True
+	if IMAGE_SKIP_UNCHANGED and na_fila:
+		manifest_service.registrar(resultado.origem.stem, resultado.hash_origem, parametros_codificacao())
+
+	# Gravado antes do envio: a resposta da API atualiza a situação da linha
+	if CATALOG_ENABLED:
+		catalog_service.registrar(
+			produto, resultado.origem, resultado.hash_origem, resultado.saidas,
+			sum(resultado.tempos.values()) * 1000,
+			catalog_service.API_PENDENTE if API_ENABLED else catalog_service.API_DESABILITADA,
+		)
+
+	if not API_ENABLED:
+		return
+
+	# Envia notificação para API externa sem bloquear a codificação; a execução
+	# aguarda as chamadas pendentes ao final
+	enviar_imagem_api_async(resultado.destino, lambda api_ok: outbox_service.concluir(produto, api_ok))
+
+
+def copiar_imagem(path: Path) -> Optional[ResultadoImagem]:
+	"""
+	Processa uma imagem no processo atual (mesmo contrato de `ProcessadorImagens.copiar`).
+
+	Returns:
+		None se o arquivo não existe mais ou não é uma imagem
+
+	Raises:
+		ArquivoNaoPronto: o arquivo ainda está sendo copiado e foi adiado em `_prontidao`
+	"""
+	try:
+		with metrics_service.medir("prontidao"):
+			pronto = _prontidao.verificar(path)
+	except FileNotFoundError:
+		return None
+	if not pronto:
+		_prontidao.adiar(path)
+		raise ArquivoNaoPronto(path.name)
+
+	resultado = processar_imagem(path)
+	if resultado is not None:
+		registrar_imagem(resultado)
+	return resultado
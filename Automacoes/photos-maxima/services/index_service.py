@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+"""
+Índice local e incremental da árvore de origem.
+
+Guarda em SQLite (em LOG_DIR) o mtime de cada diretório e o (tamanho, mtime) de cada
+imagem encontrada. Diretórios cujo mtime não mudou desde a última varredura não são
+listados novamente: os arquivos já conhecidos vêm do índice e apenas os subdiretórios
+são visitados. Somente entradas novas ou alteradas são consultadas (stat) e devolvidas
+como candidatas.
+
+Como o mtime de um diretório só muda quando entradas são criadas, removidas ou
+renomeadas, um arquivo sobrescrito no mesmo lugar não é percebido até a próxima
+revalidação completa (SCAN_INDEX_REVALIDAR_HORAS).
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import EXTS, LOG_DIR, SCAN_INDEX_REVALIDAR_HORAS
+from services.logging_service import get_app_logger
+from services.scan_service import percorrer
+from utils.db_utils import abrir_banco
+
+logger = get_app_logger()
+INDEX_FILE = LOG_DIR / "scan_index.db"
+
+
+@dataclass
+class _VisitaDiretorio:
+	"""Resultado da visita a um único diretório."""
+	caminho: str
+	mtime: float
+	listado: bool
+	subdiretorios: List[str] = field(default_factory=list)
+	arquivos: Dict[str, Tuple[int, float]] = field(default_factory=dict)
+	candidatos: List[Tuple[str, float]] = field(default_factory=list)
+	entradas: int = 0
+
+
+def _criar_tabelas(conexao) -> None:
+	conexao.executescript(
+		"""
+		CREATE TABLE IF NOT EXISTS diretorios (
+			caminho TEXT PRIMARY KEY,
+			pai TEXT,
+			mtime REAL NOT NULL
+		);
+		CREATE TABLE IF NOT EXISTS arquivos (
+			caminho TEXT PRIMARY KEY,
+			diretorio TEXT NOT NULL,
+			tamanho INTEGER NOT NULL,
+			mtime REAL NOT NULL
+		);
+		CREATE INDEX IF NOT EXISTS idx_arquivos_diretorio ON arquivos (diretorio);
+		CREATE TABLE IF NOT EXISTS metadados (
+			chave TEXT PRIMARY KEY,
+			valor TEXT
+		);
+		"""
+	)
+
+
+class IndiceArquivos:
+	"""
+	Varredura incremental da origem apoiada no índice persistido.
+
+	O índice só é gravado em `salvar()`, que deve ser chamado depois que os candidatos
+	foram processados; uma execução interrompida volta a enxergar os mesmos candidatos.
+
+	O banco é lido na primeira varredura e a cópia em memória acompanha cada `salvar()`:
+	no modo agendado a mesma instância serve a todos os ciclos sem reler o índice.
+	"""
+
+	def __init__(self, caminho_banco: Path = INDEX_FILE):
+		self.caminho_banco = caminho_banco
+		self._diretorios: Dict[str, float] = {}
+		self._subdiretorios: Dict[str, List[str]] = {}
+		self._arquivos: Dict[str, Dict[str, Tuple[int, float]]] = {}
+		self._visitas: List[_VisitaDiretorio] = []
+		self._revalidar = False
+		self._raiz: Optional[str] = None
+		self._carregado = False
+		self._ultima_revalidacao: Optional[datetime] = None
+
+	def _carregar(self, conexao) -> None:
+		self._diretorios.clear()
+		self._subdiretorios.clear()
+		self._arquivos.clear()
+
+		for caminho, pai, mtime in conexao.execute("SELECT caminho, pai, mtime FROM diretorios"):
+			self._diretorios[caminho] = mtime
+			if pai is not None:
+				self._subdiretorios.setdefault(pai, []).append(caminho)
+
+		for caminho, diretorio, tamanho, mtime in conexao.execute(
+			"SELECT caminho, diretorio, tamanho, mtime FROM arquivos"
+		):
+			self._arquivos.setdefault(diretorio, {})[caminho] = (tamanho, mtime)
+
+		linha = conexao.execute("SELECT valor FROM metadados WHERE chave = 'ultima_revalidacao'").fetchone()
+		self._ultima_revalidacao = datetime.fromisoformat(linha[0]) if linha and linha[0] else None
+		self._carregado = True
+
+	def _visitar(self, diretorio: str) -> _VisitaDiretorio:
+		"""
+		Visita um diretório, listando-o apenas se ele mudou desde a última varredura.
+
+		Executado nas threads da varredura: apenas lê o índice carregado em memória.
+		"""
+		mtime = os.stat(diretorio).st_mtime
+		conhecidos = self._arquivos.get(diretorio, {})
+
+		if not self._revalidar and self._diretorios.get(diretorio) == mtime:
+			return _VisitaDiretorio(
+				caminho=diretorio,
+				mtime=mtime,
+				listado=False,
+				subdiretorios=list(self._subdiretorios.get(diretorio, [])),
+				arquivos=dict(conhecidos),
+			)
+
+		visita = _VisitaDiretorio(caminho=diretorio, mtime=mtime, listado=True)
+		with os.scandir(diretorio) as entradas:
+			for entrada in entradas:
+				visita.entradas += 1
+				try:
+					# Link para diretório não é seguido: um link para um ancestral prenderia a varredura em ciclo
+					if entrada.is_dir(follow_symlinks=False):
+						visita.subdiretorios.append(entrada.path)
+						continue
+					if not entrada.is_file():
+						continue
+					if os.path.splitext(entrada.name)[1].lower() not in EXTS:
+						continue
+
+					stat_info = entrada.stat()
+				except (PermissionError, OSError):
+					continue
+
+				visita.arquivos[entrada.path] = (stat_info.st_size, stat_info.st_mtime)
+				if conhecidos.get(entrada.path) != (stat_info.st_size, stat_info.st_mtime):
+					referencia = max(stat_info.st_mtime, getattr(stat_info, "st_ctime", stat_info.st_mtime))
+					visita.candidatos.append((entrada.path, referencia))
+		return visita
+
+	def varrer(self, origem: Path) -> Iterator[Tuple[Path, datetime]]:
+		"""Percorre a origem e devolve (arquivo, data de referência) das imagens novas ou alteradas."""
+		if not self._carregado:
+			conexao = abrir_banco(self.caminho_banco)
+			try:
+				_criar_tabelas(conexao)
+				self._carregar(conexao)
+			finally:
+				conexao.close()
+
+		self._revalidar = (
+			self._ultima_revalidacao is None
+			or datetime.now() - self._ultima_revalidacao >= timedelta(hours=SCAN_INDEX_REVALIDAR_HORAS)
+		)
+		self._raiz = str(origem)
+		self._visitas = []
+		if self._revalidar:
+			logger.info("Índice de varredura: revalidação completa da origem")
+
+		inicio = time.monotonic()
+		listados = 0
+		entradas = 0
+		for visita in percorrer(self._raiz, self._visitar, lambda v: v.subdiretorios):
+			self._visitas.append(visita)
+			listados += visita.listado
+			entradas += visita.entradas
+			for caminho, referencia in visita.candidatos:
+				yield Path(caminho), datetime.fromtimestamp(referencia)
+
+		duracao = time.monotonic() - inicio
+		taxa = entradas / duracao if duracao > 0 else 0
+		logger.info(
+			f"Índice de varredura: {len(self._visitas)} diretórios, {listados} listados, "
+			f"{entradas} entradas em {duracao:.1f}s ({taxa:.0f} entradas/s)"
+		)
+
+	def salvar(self, nao_concluidos: Iterable[Path] = ()) -> None:
+		"""
+		Persiste o resultado da última varredura no índice.
+
+		Args:
+			nao_concluidos: Candidatos que falharam ou foram adiados; ficam fora do índice
+				(e seus diretórios são listados de novo) para voltarem na próxima varredura
+		"""
+		if self._raiz is None:
+			return
+
+		esquecer = {str(arquivo) for arquivo in nao_concluidos}
+		if esquecer:
+			for visita in self._visitas:
+				if esquecer.intersection(visita.arquivos):
+					visita.arquivos = {c: v for c, v in visita.arquivos.items() if c not in esquecer}
+					visita.listado = True
+					visita.mtime = -1.0
+
+		visitados = {visita.caminho for visita in self._visitas}
+		pais = {sub: visita.caminho for visita in self._visitas for sub in visita.subdiretorios}
+		removidos = [
+			caminho for caminho in self._diretorios
+			if caminho not in visitados and (caminho == self._raiz or caminho.startswith(self._raiz + os.sep))
+		]
+
+		conexao = abrir_banco(self.caminho_banco)
+		try:
+			with conexao:
+				conexao.executemany("DELETE FROM diretorios WHERE caminho = ?", ((c,) for c in removidos))
+				conexao.executemany("DELETE FROM arquivos WHERE diretorio = ?", ((c,) for c in removidos))
+				for visita in self._visitas:
+					conexao.execute(
+						"INSERT OR REPLACE INTO diretorios (caminho, pai, mtime) VALUES (?, ?, ?)",
+						(visita.caminho, pais.get(visita.caminho), visita.mtime),
+					)
+					if not visita.listado:
+						continue
+					conexao.execute("DELETE FROM arquivos WHERE diretorio = ?", (visita.caminho,))
+					conexao.executemany(
+						"INSERT INTO arquivos (caminho, diretorio, tamanho, mtime) VALUES (?, ?, ?, ?)",
+						(
+							(caminho, visita.caminho, tamanho, mtime)
+							for caminho, (tamanho, mtime) in visita.arquivos.items()
+						),
+					)
+				agora = datetime.now()
+				if self._revalidar:
+					conexao.execute(
+						"INSERT OR REPLACE INTO metadados (chave, valor) VALUES ('ultima_revalidacao', ?)",
+						(agora.isoformat(),),
+					)
+		except Exception as exc:
+			logger.warning(f"Não foi possível persistir o índice de varredura: {exc}")
+			# Memória e banco podem ter divergido: a próxima varredura relê o banco
+			self._carregado = False
+			return
+		finally:
+			conexao.close()
+
+		# Mesmo conteúdo que acabou de ser gravado, para a próxima varredura desta instância
+		for caminho in removidos:
+			self._diretorios.pop(caminho, None)
+			self._subdiretorios.pop(caminho, None)
+			self._arquivos.pop(caminho, None)
+		for visita in self._visitas:
+			self._diretorios[visita.caminho] = visita.mtime
+			self._subdiretorios[visita.caminho] = list(visita.subdiretorios)
+			if visita.listado:
+				self._arquivos[visita.caminho] = dict(visita.arquivos)
+		if self._revalidar:
+			self._ultima_revalidacao = agora
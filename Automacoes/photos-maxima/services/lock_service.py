@@ -1,136 +1,182 @@
 """
 Serviço para gerenciar lock file e garantir execução única do script.
+
+O lock é um lock consultivo do sistema operacional (flock no Linux, msvcrt.locking
+no Windows) mantido enquanto o processo existir: se o processo morrer, o sistema
+libera o lock sozinho, sem precisar verificar PIDs. Quando outra instância já está
+rodando, LOCK_POLICY define o que fazer:
+
+- pular: esta execução não roda;
+- esperar: aguarda até LOCK_TIMEOUT segundos a anterior terminar;
+- drenar: pede à anterior que termine os arquivos em andamento e saia, e aguarda
+  até LOCK_TIMEOUT segundos pelo lock.
 """
 import os
 import sys
 import time
-import signal
-from pathlib import Path
 from typing import Optional
 
-from config import LOG_DIR
+from config import LOG_DIR, LOCK_POLICY, LOCK_TIMEOUT
 from services.logging_service import get_app_logger
 
 logger = get_app_logger()
 LOCK_FILE = LOG_DIR / "photos_maxima.lock"
+# Sinal de drenagem: criado pela instância que está esperando o lock
+DRAIN_FILE = LOG_DIR / "photos_maxima.drenar"
 
+POLITICAS = {"pular", "esperar", "drenar"}
+_INTERVALO_TENTATIVA = 1.0
+_INTERVALO_VERIFICACAO_DRENAGEM = 1.0
 
-def _obter_pid_do_lock() -> Optional[int]:
-	"""Lê o PID do arquivo de lock."""
-	if not LOCK_FILE.exists():
-		return None
-	
-	try:
-		pid_str = LOCK_FILE.read_text(encoding="utf-8").strip()
-		return int(pid_str)
-	except (ValueError, OSError):
-		return None
+_descritor: Optional[int] = None
+_ultima_verificacao_drenagem = 0.0
+_drenagem = False
 
 
-def _processo_esta_rodando(pid: int) -> bool:
-	"""Verifica se um processo com o PID especificado está rodando."""
+def _tentar_travar(descritor: int) -> bool:
+	"""Tenta obter o lock exclusivo sem bloquear."""
 	try:
 		if sys.platform == "win32":
-			# Windows
-			import subprocess
-			result = subprocess.run(
-				["tasklist", "/FI", f"PID eq {pid}"],
-				capture_output=True,
-				text=True,
-				timeout=5
-			)
-			return str(pid) in result.stdout
+			import msvcrt
+			os.lseek(descritor, 0, os.SEEK_SET)
+			msvcrt.locking(descritor, msvcrt.LK_NBLCK, 1)
 		else:
-			# Linux/Unix
-			os.kill(pid, 0)
-			return True
-	except Exception:
+			import fcntl
+			fcntl.flock(descritor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+		return True
+	except OSError:
 		return False
 
 
-def _matar_processo(pid: int) -> bool:
-	"""Tenta matar um processo pelo PID."""
+def _destravar(descritor: int) -> None:
 	try:
 		if sys.platform == "win32":
-			# Windows
-			import subprocess
-			subprocess.run(
-				["taskkill", "/F", "/PID", str(pid)],
-				capture_output=True,
-				timeout=10
-			)
-			time.sleep(1)  # Aguarda o processo terminar
-			return not _processo_esta_rodando(pid)
+			import msvcrt
+			os.lseek(descritor, 0, os.SEEK_SET)
+			msvcrt.locking(descritor, msvcrt.LK_UNLCK, 1)
 		else:
-			# Linux/Unix
-			os.kill(pid, signal.SIGTERM)
-			time.sleep(1)
-			if _processo_esta_rodando(pid):
-				os.kill(pid, signal.SIGKILL)
-				time.sleep(1)
-			return not _processo_esta_rodando(pid)
-	except Exception as exc:
-		logger.error(f"Erro ao tentar matar processo {pid}: {exc}")
-		return False
+			import fcntl
+			fcntl.flock(descritor, fcntl.LOCK_UN)
+	except OSError:
+		pass
+
+
+def _registrar_pid(descritor: int) -> None:
+	"""Grava o PID no lock file (apenas informativo; o lock é o que vale)."""
+	try:
+		os.ftruncate(descritor, 0)
+		os.lseek(descritor, 0, os.SEEK_SET)
+		os.write(descritor, str(os.getpid()).encode("ascii"))
+	except OSError:
+		pass
 
 
-def criar_lock() -> bool:
+def criar_lock(politica: str = LOCK_POLICY, timeout: float = LOCK_TIMEOUT) -> bool:
 	"""
-	Cria um arquivo de lock com o PID do processo atual.
-	Se já existir um lock de um processo rodando, mata o processo anterior.
-	
+	Obtém o lock de execução única, aplicando a política quando outra instância o detém.
+
+	Args:
+		politica: "pular", "esperar" ou "drenar"
+		timeout: Espera máxima pelo lock nas políticas "esperar" e "drenar" (segundos)
+
 	Returns:
-		True se conseguiu criar o lock, False caso contrário
+		True se conseguiu o lock, False caso contrário
 	"""
-	pid_atual = os.getpid()
-	
-	# Verificar se já existe um lock
-	pid_anterior = _obter_pid_do_lock()
-	
-	if pid_anterior is not None:
-		if pid_anterior == pid_atual:
-			# É o mesmo processo, já tem o lock
-			return True
-		
-		# Verificar se o processo anterior ainda está rodando
-		if _processo_esta_rodando(pid_anterior):
-			logger.warning(f"Processo anterior ainda está rodando (PID: {pid_anterior}). Encerrando...")
-			if _matar_processo(pid_anterior):
-				logger.info(f"Processo anterior (PID: {pid_anterior}) encerrado com sucesso.")
-			else:
-				logger.error(f"Falha ao encerrar processo anterior (PID: {pid_anterior}).")
-				return False
-		else:
-			logger.info(f"Lock file encontrado, mas processo anterior (PID: {pid_anterior}) não está mais rodando. Removendo lock antigo.")
-	
-	# Criar novo lock file
-	try:
-		LOCK_FILE.write_text(str(pid_atual), encoding="utf-8")
-		logger.info(f"Lock file criado (PID: {pid_atual})")
+	global _descritor
+	if _descritor is not None:
 		return True
-	except Exception as exc:
-		logger.error(f"Erro ao criar lock file: {exc}")
+
+	politica = politica.strip().lower()
+	if politica not in POLITICAS:
+		logger.warning(f"LOCK_POLICY inválida ({politica}); usando 'pular'")
+		politica = "pular"
+
+	try:
+		LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+		descritor = os.open(LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+	except OSError as exc:
+		logger.error(f"Erro ao abrir lock file: {exc}")
 		return False
 
+	obtido = _tentar_travar(descritor)
+	if not obtido and politica != "pular":
+		if politica == "drenar":
+			try:
+				DRAIN_FILE.write_text(str(os.getpid()), encoding="utf-8")
+				logger.warning("Outra instância está rodando. Pedindo que conclua os arquivos em andamento e encerre...")
+			except OSError as exc:
+				logger.error(f"Não foi possível sinalizar a drenagem da instância anterior: {exc}")
+		else:
+			logger.warning(f"Outra instância está rodando. Aguardando até {timeout:.0f}s...")
+
+		limite = time.monotonic() + timeout
+		while not obtido and time.monotonic() < limite:
+			time.sleep(_INTERVALO_TENTATIVA)
+			obtido = _tentar_travar(descritor)
+
+	if not obtido:
+		os.close(descritor)
+		if politica == "pular":
+			logger.info("Outra instância está rodando (LOCK_POLICY=pular). Esta execução não será feita.")
+		else:
+			logger.error(f"A instância anterior não liberou o lock em {timeout:.0f}s.")
+		return False
+
+	_descritor = descritor
+	_registrar_pid(descritor)
+	# Um pedido de drenagem existente era para o detentor anterior do lock
+	try:
+		DRAIN_FILE.unlink(missing_ok=True)
+	except OSError:
+		pass
+	logger.info(f"Lock obtido (PID: {os.getpid()})")
+	return True
+
 
 def remover_lock() -> None:
-	"""Remove o arquivo de lock."""
+	"""
+	Libera o lock.
+
+	O arquivo não é apagado: apagar um lock file enquanto outra instância o tem aberto
+	permitiria dois detentores (um no arquivo antigo, outro no novo).
+	"""
+	global _descritor
+	if _descritor is None:
+		return
 	try:
-		if LOCK_FILE.exists():
-			LOCK_FILE.unlink()
-			logger.info("Lock file removido")
+		_destravar(_descritor)
+		os.close(_descritor)
+		logger.info("Lock liberado")
 	except Exception as exc:
-		logger.error(f"Erro ao remover lock file: {exc}")
+		logger.error(f"Erro ao liberar lock: {exc}")
+	finally:
+		_descritor = None
 
 
 def verificar_lock() -> bool:
 	"""
-	Verifica se o lock file atual pertence ao processo atual.
-	
+	Verifica se o lock pertence ao processo atual.
+
 	Returns:
 		True se o lock pertence ao processo atual, False caso contrário
 	"""
-	pid_atual = os.getpid()
-	pid_lock = _obter_pid_do_lock()
-	return pid_lock == pid_atual
+	return _descritor is not None
+
+
+def drenagem_solicitada() -> bool:
+	"""
+	Indica se outra instância pediu que esta conclua o que está em andamento e encerre.
+
+	Barato o bastante para o laço de processamento: o arquivo de sinal é consultado no
+	máximo uma vez por segundo e, depois de visto, a resposta fica fixa.
+	"""
+	global _ultima_verificacao_drenagem, _drenagem
+	if _drenagem or _descritor is None:
+		return _drenagem
 
+	agora = time.monotonic()
+	if agora - _ultima_verificacao_drenagem < _INTERVALO_VERIFICACAO_DRENAGEM:
+		return False
+	_ultima_verificacao_drenagem = agora
+	_drenagem = DRAIN_FILE.exists()
+	return _drenagem
@@ -1,7 +1,11 @@
+import atexit
 import logging
+import queue
+import sys
 from logging import StreamHandler
-from logging.handlers import RotatingFileHandler
-from config import APP_LOG_PATH, PHOTOS_LOG_PATH, LOG_MAX_BYTES, LOG_BACKUP_COUNT
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from config import APP_LOG_PATH, PHOTOS_LOG_PATH, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ASYNC
 
 # Adiciona nível SUCCESS customizado
 SUCCESS_LEVEL = 25
@@ -14,23 +18,82 @@ def success(self, message, *args, **kwargs):
 logging.Logger.success = success
 
 _configured = False
+_listener = None
+
+class _ArquivoRotativo(RotatingFileHandler):
+	"""Cria a pasta e abre o arquivo só no primeiro registro: importar os serviços não toca o disco."""
+
+	def _open(self):
+		Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+		return super()._open()
+
 
 def _build_rotating_handler(log_path):
-	handler = RotatingFileHandler(log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+	handler = _ArquivoRotativo(
+		log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+	)
 	formatter = logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s")
 	handler.setFormatter(formatter)
 	return handler
 
 
 
+def _somente_photos(record):
+	return record.name == "photos"
+
+def _exceto_photos(record):
+	return record.name != "photos"
+
+def _build_console_handler(formato):
+	console_handler = StreamHandler()
+	console_handler.setFormatter(logging.Formatter(formato))
+	return console_handler
+
 def setup_loggers():
-	global _configured
+	global _configured, _listener
 	if _configured:
 		return
 
 	root_logger = logging.getLogger()
 	root_logger.setLevel(logging.INFO)
 
+	# Processos do pool de imagens não escrevem nos arquivos rotativos (evita
+	# disputa de rotação entre processos); suas falhas voltam ao processo principal.
+	# Um filho do pool sempre já carregou o multiprocessing: não importá-lo aqui poupa a inicialização
+	multiprocessing = sys.modules.get("multiprocessing")
+	if multiprocessing is not None and multiprocessing.parent_process() is not None:
+		if not root_logger.handlers:
+			root_logger.addHandler(_build_console_handler("%(asctime)s | %(levelname)s | %(processName)s | %(message)s"))
+		_configured = True
+		return
+
+	photos_logger = logging.getLogger("photos")
+	photos_logger.setLevel(logging.INFO)
+	photos_logger.propagate = False
+
+	if LOG_ASYNC:
+		# O laço de processamento só enfileira o registro; uma única thread formata,
+		# grava, rotaciona os arquivos e escreve no console
+		app_file_handler = _build_rotating_handler(APP_LOG_PATH)
+		app_file_handler.addFilter(_exceto_photos)
+		console_handler = _build_console_handler("%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+		console_handler.addFilter(_exceto_photos)
+		photos_file_handler = _build_rotating_handler(PHOTOS_LOG_PATH)
+		photos_file_handler.addFilter(_somente_photos)
+
+		fila = queue.SimpleQueue()
+		_listener = QueueListener(
+			fila, app_file_handler, console_handler, photos_file_handler, respect_handler_level=True
+		)
+		_listener.start()
+		# Registrado depois do logging: roda antes do logging.shutdown e esvazia a fila
+		atexit.register(finalizar_logs)
+
+		root_logger.addHandler(QueueHandler(fila))
+		photos_logger.addHandler(QueueHandler(fila))
+		_configured = True
+		return
+
 	# File handler (app.log)
 	has_file_handler = any(isinstance(h, RotatingFileHandler) for h in root_logger.handlers)
 	if not has_file_handler:
@@ -39,18 +102,20 @@ def setup_loggers():
 	# Console handler (stdout)
 	has_console_handler = any(isinstance(h, StreamHandler) for h in root_logger.handlers)
 	if not has_console_handler:
-		console_handler = StreamHandler()
-		console_handler.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s"))
-		root_logger.addHandler(console_handler)
+		root_logger.addHandler(_build_console_handler("%(asctime)s | %(levelname)s | %(name)s | %(message)s"))
 
-	photos_logger = logging.getLogger("photos")
 	if not photos_logger.handlers:
-		photos_logger.setLevel(logging.INFO)
 		photos_logger.addHandler(_build_rotating_handler(PHOTOS_LOG_PATH))
-		photos_logger.propagate = False
 
 	_configured = True
 
+def finalizar_logs():
+	"""Grava os registros ainda na fila e encerra a thread de logging (modo LOG_ASYNC)."""
+	global _listener
+	if _listener is not None:
+		_listener.stop()
+		_listener = None
+
 def get_app_logger():
 	setup_loggers()
 	return logging.getLogger("app")
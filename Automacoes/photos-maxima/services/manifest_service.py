@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+"""
+Manifesto das imagens já publicadas no destino.
+
+Para cada produto (nome do arquivo sem extensão) guarda o hash do conteúdo de origem e
+os parâmetros de codificação usados. Uma imagem cujo conteúdo e parâmetros coincidem
+com o manifesto não é recodificada, regravada no destino nem reenviada à API.
+
+Leituras podem acontecer nos processos do pool de imagens; gravações acontecem apenas
+no processo principal.
+"""
+
+import threading
+from datetime import datetime
+from typing import Optional, Tuple
+
+from config import LOG_DIR
+from services.logging_service import get_app_logger
+from utils.db_utils import abrir_banco
+
+logger = get_app_logger()
+MANIFEST_FILE = LOG_DIR / "manifest.db"
+
+_conexao = None
+_lock = threading.Lock()
+
+
+def _obter_conexao():
+	global _conexao
+	if _conexao is None:
+		_conexao = abrir_banco(MANIFEST_FILE)
+		_conexao.execute(
+			"""
+			CREATE TABLE IF NOT EXISTS manifesto (
+				produto TEXT PRIMARY KEY,
+				hash_origem TEXT NOT NULL,
+				parametros TEXT NOT NULL,
+				atualizado_em TEXT NOT NULL
+			)
+			"""
+		)
+		_conexao.commit()
+	return _conexao
+
+
+def obter_registro(produto: str) -> Optional[Tuple[str, str]]:
+	"""Retorna (hash_origem, parametros) registrados para o produto, se houver."""
+	try:
+		with _lock:
+			return _obter_conexao().execute(
+				"SELECT hash_origem, parametros FROM manifesto WHERE produto = ?", (produto,)
+			).fetchone()
+	except Exception as exc:
+		logger.warning(f"Falha ao consultar manifesto de {produto}: {exc}")
+		return None
+
+
+def registrar(produto: str, hash_origem: str, parametros: str) -> None:
+	"""Registra o conteúdo e os parâmetros publicados para o produto."""
+	try:
+		with _lock:
+			conexao = _obter_conexao()
+			with conexao:
+				conexao.execute(
+					"INSERT OR REPLACE INTO manifesto (produto, hash_origem, parametros, atualizado_em) "
+					"VALUES (?, ?, ?, ?)",
+					(produto, hash_origem, parametros, datetime.now().isoformat()),
+				)
+	except Exception as exc:
+		logger.warning(f"Não foi possível atualizar o manifesto de {produto}: {exc}")
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+"""
+Métricas de tempo por etapa da execução (varredura, espera por arquivos em cópia,
+decodificação, redimensionamento, compressão, gravação no destino, API...).
+
+Cada etapa vira um histograma com buckets fixos (mesmo modelo do Prometheus). Ao final
+da execução as métricas são gravadas em METRICS_DIR como JSON e/ou arquivo texto do
+Prometheus (node_exporter textfile collector), e o resumo das etapas mais demoradas vai
+para o app.log e para a mensagem final do Telegram.
+
+As etapas medidas nos processos do pool de imagens voltam ao processo principal junto
+com o resultado da imagem (ver `ResultadoImagem.tempos`).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from config import LOG_DIR, METRICS_DIR, METRICS_FORMAT
+from services.logging_service import get_app_logger
+
+logger = get_app_logger()
+
+# Limites superiores dos buckets, em segundos
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_PREFIXO = "photos_maxima"
+
+
+class _Histograma:
+	def __init__(self):
+		self.contagens = [0] * (len(_BUCKETS) + 1)
+		self.quantidade = 0
+		self.soma = 0.0
+		self.maximo = 0.0
+
+	def registrar(self, segundos: float) -> None:
+		indice = next((i for i, limite in enumerate(_BUCKETS) if segundos <= limite), len(_BUCKETS))
+		self.contagens[indice] += 1
+		self.quantidade += 1
+		self.soma += segundos
+		self.maximo = max(self.maximo, segundos)
+
+	def percentil(self, percentil: float) -> float:
+		"""Estimativa pelo limite superior do bucket (o último usa o máximo observado)."""
+		alvo = percentil / 100 * self.quantidade
+		acumulado = 0
+		for indice, contagem in enumerate(self.contagens):
+			acumulado += contagem
+			if contagem and acumulado >= alvo:
+				return min(_BUCKETS[indice], self.maximo) if indice < len(_BUCKETS) else self.maximo
+		return self.maximo
+
+
+class Metricas:
+	"""Histogramas por etapa e contadores de uma execução; seguro entre threads."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._inicio = time.time()
+		self._histogramas: Dict[str, _Histograma] = {}
+		self._contadores: Dict[str, int] = {}
+
+	def reiniciar(self) -> None:
+		"""Descarta o que foi medido até aqui e começa uma nova execução."""
+		with self._lock:
+			self._inicio = time.time()
+			self._histogramas = {}
+			self._contadores = {}
+
+	def registrar(self, etapa: str, segundos: float) -> None:
+		with self._lock:
+			self._histogramas.setdefault(etapa, _Histograma()).registrar(segundos)
+
+	def registrar_tempos(self, tempos: Dict[str, float]) -> None:
+		for etapa, segundos in tempos.items():
+			self.registrar(etapa, segundos)
+
+	def contar(self, nome: str, quantidade: int = 1) -> None:
+		with self._lock:
+			self._contadores[nome] = self._contadores.get(nome, 0) + quantidade
+
+	@contextmanager
+	def medir(self, etapa: str) -> Iterator[None]:
+		inicio = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.registrar(etapa, time.perf_counter() - inicio)
+
+	def instantaneo(self) -> dict:
+		"""Estado atual das métricas em um dicionário serializável em JSON."""
+		with self._lock:
+			etapas = {
+				etapa: {
+					"quantidade": hist.quantidade,
+					"total_s": round(hist.soma, 4),
+					"media_ms": round(hist.soma / hist.quantidade * 1000, 2) if hist.quantidade else 0.0,
+					"p50_ms": round(hist.percentil(50) * 1000, 2),
+					"p95_ms": round(hist.percentil(95) * 1000, 2),
+					"max_ms": round(hist.maximo * 1000, 2),
+					"buckets": {
+						**{str(limite): contagem for limite, contagem in zip(_BUCKETS, hist.contagens)},
+						"+Inf": hist.contagens[-1],
+					},
+				}
+				for etapa, hist in sorted(self._histogramas.items())
+			}
+			return {
+				"inicio": datetime.fromtimestamp(self._inicio).isoformat(timespec="seconds"),
+				"duracao_s": round(time.time() - self._inicio, 3),
+				"etapas": etapas,
+				"contadores": dict(sorted(self._contadores.items())),
+			}
+
+	def prometheus(self) -> str:
+		"""Métricas no formato texto de exposição do Prometheus."""
+		with self._lock:
+			linhas = [
+				f"# HELP {_PREFIXO}_etapa_segundos Duração das etapas do processamento de imagens",
+				f"# TYPE {_PREFIXO}_etapa_segundos histogram",
+			]
+			for etapa, hist in sorted(self._histogramas.items()):
+				acumulado = 0
+				for limite, contagem in zip(_BUCKETS, hist.contagens):
+					acumulado += contagem
+					linhas.append(f'{_PREFIXO}_etapa_segundos_bucket{{etapa="{etapa}",le="{limite}"}} {acumulado}')
+				linhas.append(f'{_PREFIXO}_etapa_segundos_bucket{{etapa="{etapa}",le="+Inf"}} {hist.quantidade}')
+				linhas.append(f'{_PREFIXO}_etapa_segundos_sum{{etapa="{etapa}"}} {hist.soma:.6f}')
+				linhas.append(f'{_PREFIXO}_etapa_segundos_count{{etapa="{etapa}"}} {hist.quantidade}')
+
+			for nome, valor in sorted(self._contadores.items()):
+				linhas.append(f"# TYPE {_PREFIXO}_{nome}_total counter")
+				linhas.append(f"{_PREFIXO}_{nome}_total {valor}")
+
+			linhas.append(f"# TYPE {_PREFIXO}_ultima_execucao_timestamp_seconds gauge")
+			linhas.append(f"{_PREFIXO}_ultima_execucao_timestamp_seconds {time.time():.0f}")
+		return "\n".join(linhas) + "\n"
+
+	def resumo(self, maximo: int = 5) -> List[str]:
+		"""Etapas que mais consumiram tempo, da maior para a menor."""
+		with self._lock:
+			ordenadas = sorted(self._histogramas.items(), key=lambda item: item[1].soma, reverse=True)
+			return [
+				f"{etapa}: {hist.soma:.1f}s ({hist.quantidade}x, p95 {hist.percentil(95) * 1000:.0f}ms)"
+				for etapa, hist in ordenadas[:maximo]
+			]
+
+
+_metricas = Metricas()
+
+
+@contextmanager
+def cronometrar(tempos: Dict[str, float], etapa: str) -> Iterator[None]:
+	"""Acumula a duração do bloco em `tempos`, sem estado global (usável no pool)."""
+	inicio = time.perf_counter()
+	try:
+		yield
+	finally:
+		tempos[etapa] = tempos.get(etapa, 0.0) + time.perf_counter() - inicio
+
+
+def medir(etapa: str):
+	"""Context manager que registra a duração do bloco na etapa informada."""
+	return _metricas.medir(etapa)
+
+
+def registrar(etapa: str, segundos: float) -> None:
+	_metricas.registrar(etapa, segundos)
+
+
+def registrar_tempos(tempos: Dict[str, float]) -> None:
+	"""Registra as etapas medidas em outro processo (ex.: pool de imagens)."""
+	_metricas.registrar_tempos(tempos)
+
+
+def contar(nome: str, quantidade: int = 1) -> None:
+	_metricas.contar(nome, quantidade)
+
+
+def iniciar_execucao() -> None:
+	"""Zera as métricas: cada ciclo do modo agendado exporta só a própria execução."""
+	_metricas.reiniciar()
+
+
+def _gravar_atomico(caminho: Path, conteudo: str) -> None:
+	# O coletor do Prometheus pode ler o arquivo a qualquer momento: nunca expõe um parcial
+	temporario = caminho.with_name(f".{caminho.name}.tmp")
+	temporario.write_text(conteudo, encoding="utf-8")
+	os.replace(temporario, caminho)
+
+
+def finalizar_execucao() -> List[str]:
+	"""
+	Exporta as métricas da execução e registra o resumo das etapas no app.log.
+
+	Returns:
+		Linhas do resumo (etapas mais demoradas), para a mensagem final
+	"""
+	resumo = _metricas.resumo()
+	if resumo:
+		logger.info("TEMPO POR ETAPA: " + " | ".join(resumo))
+
+	formato = METRICS_FORMAT.strip().lower()
+	if formato in {"", "nenhum", "off"}:
+		return resumo
+
+	diretorio = Path(METRICS_DIR).expanduser() if METRICS_DIR else LOG_DIR
+	try:
+		diretorio.mkdir(parents=True, exist_ok=True)
+		if formato in {"json", "ambos"}:
+			_gravar_atomico(diretorio / "metrics.json", json.dumps(_metricas.instantaneo(), indent=2, ensure_ascii=False))
+		if formato in {"prometheus", "ambos"}:
+			_gravar_atomico(diretorio / "photos_maxima.prom", _metricas.prometheus())
+	except Exception as exc:
+		logger.warning(f"Não foi possível gravar as métricas em {diretorio}: {exc}")
+	return resumo
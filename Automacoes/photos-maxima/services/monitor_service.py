@@ -13,14 +13,30 @@ A cada execução o script:
 5. Salva o timestamp da execução atual.
 """
 
+import threading
+import time
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterator, List, Optional
 
-from config import DESTINO, EXTS
-from services.image_service import copiar_imagem
+from config import (
+	DESTINO, PIPELINE_QUEUE_SIZE, PIPELINE_STREAMING, PIPELINE_WORKERS, READINESS_MAX_ESPERA,
+	SCAN_INDEX_ENABLED,
+)
+from services import metrics_service
+from services.api_service import finalizar_envios
+from services.image_service import ImagemInvalida
+from services.index_service import IndiceArquivos
+from services.lock_service import drenagem_solicitada
 from services.logging_service import get_app_logger
-from services.state_service import obter_ultima_execucao, salvar_execucao
+from services.pipeline_service import ProcessadorImagens, executar_pipeline
+from services.readiness_service import ArquivoNaoPronto
+from services.scan_service import varrer_imagens
+from services.state_service import (
+	DiarioExecucao, obter_invalidos, obter_pendentes, obter_ultima_execucao, salvar_execucao, salvar_invalidos,
+	salvar_pendentes,
+)
 
 logger = get_app_logger()
 
@@ -65,46 +81,86 @@ def _calcular_intervalo_execucao(agora: datetime | None = None) -> tuple[datetim
 	return inicio, ref
 
 
-def _listar_imagens_intervalo(origem: Path, inicio: datetime, fim: datetime) -> List[Path]:
-	"""Retorna todas as imagens encontradas dentro da janela solicitada."""
-	selecionadas: List[tuple[datetime, Path]] = []
-	contador = 0
+def _iterar_imagens_intervalo(
+	origem: Path,
+	inicio: datetime,
+	fim: datetime,
+	indice: Optional[IndiceArquivos] = None,
+	posteriores: Optional[List[Path]] = None,
+) -> Iterator[tuple[datetime, Path]]:
+	"""
+	Devolve as imagens dentro da janela solicitada à medida que são encontradas.
 
+	Args:
+		posteriores: Recebe as imagens com data depois do fim da janela (gravadas entre o
+			minuto de corte e a varredura); não podem entrar no índice como conhecidas
+	"""
 	logger.info("Buscando imagens no diretório...")
+
+	if indice is not None:
+		# Apenas entradas novas ou alteradas desde a última varredura são candidatas
+		encontradas = indice.varrer(origem)
+	else:
+		encontradas = varrer_imagens(origem)
 	
+	# Conta como varredura só o tempo esperando a busca, não o de quem consome as imagens
+	gasto = 0.0
 	try:
-		for arquivo in origem.rglob("*"):
-			contador += 1
-			# Log de progresso a cada 1000 arquivos verificados
-			if contador % 1000 == 0:
-				logger.info(f"Verificados {contador} arquivos...")
-			
-			try:
-				if not arquivo.is_file():
-					continue
-				if arquivo.suffix.lower() not in EXTS:
-					continue
-
-				stat_info = arquivo.stat()
-				data_referencia = datetime.fromtimestamp(
-					max(stat_info.st_mtime, getattr(stat_info, "st_ctime", stat_info.st_mtime))
-				)
-			except (PermissionError, OSError):
-				continue
-
+		inicio_busca = time.perf_counter()
+		for arquivo, data_referencia in encontradas:
 			if inicio <= data_referencia <= fim:
-				selecionadas.append((data_referencia, arquivo))
+				gasto += time.perf_counter() - inicio_busca
+				yield data_referencia, arquivo
+				inicio_busca = time.perf_counter()
+			elif data_referencia > fim and posteriores is not None:
+				posteriores.append(arquivo)
+		gasto += time.perf_counter() - inicio_busca
 	except KeyboardInterrupt:
 		logger.error("Busca de imagens interrompida pelo usuário")
 		raise
+	finally:
+		metrics_service.registrar("varredura", gasto)
+
 
-	logger.info(f"Busca concluída. Total de arquivos verificados: {contador}")
+def _listar_imagens_intervalo(
+	origem: Path,
+	inicio: datetime,
+	fim: datetime,
+	indice: Optional[IndiceArquivos] = None,
+	posteriores: Optional[List[Path]] = None,
+) -> List[tuple[datetime, Path]]:
+	"""Retorna (data de referência, arquivo) de todas as imagens da janela, em ordem de data."""
+	selecionadas = list(_iterar_imagens_intervalo(origem, inicio, fim, indice, posteriores))
 	selecionadas.sort(key=lambda registro: registro[0])
-	return [arquivo for _, arquivo in selecionadas]
+	return selecionadas
 
 
-def monitorar(diretorio: str):
-	"""Executa o processamento pontual baseado em janela temporal."""
+def _referencia(arquivo: Path) -> datetime:
+	"""Mesma data de referência usada na varredura: max(mtime, ctime)."""
+	stat_info = arquivo.stat()
+	return datetime.fromtimestamp(max(stat_info.st_mtime, getattr(stat_info, "st_ctime", stat_info.st_mtime)))
+
+
+def monitorar(
+	diretorio: str,
+	processador: Optional[ProcessadorImagens] = None,
+	progresso: Optional[Callable[[int, Optional[int]], None]] = None,
+	resumo_api: bool = True,
+	indice: Optional[IndiceArquivos] = None,
+):
+	"""
+	Executa o processamento pontual baseado em janela temporal.
+
+	Args:
+		diretorio: Diretório de origem
+		processador: Processador já iniciado (modo contínuo); se None, um novo é criado
+		progresso: Chamado a cada imagem concluída com (concluídas, total); o total é None
+			enquanto a varredura do pipeline ainda não terminou. Deve retornar rápido.
+		resumo_api: Aguarda as notificações e registra (zerando) as estatísticas da API;
+			False quando quem chamou faz o resumo da sessão inteira (modo contínuo)
+		indice: Índice de varredura já carregado (modo agendado); se None, um novo é
+			criado quando SCAN_INDEX_ENABLED
+	"""
 	origem = Path(diretorio).expanduser().resolve()
 	
 	# Verificar se o diretório existe
@@ -124,30 +180,195 @@ def monitorar(diretorio: str):
 		raise OSError(f"Erro de rede/acesso ao diretório: {origem}") from exc
 
 	inicio, fim = _calcular_intervalo_execucao()
-	arquivos = _listar_imagens_intervalo(origem, inicio, fim)
-	
-	logger.info(f"IMAGENS LOCALIZADAS: {len(arquivos)}")
-	
-	if not arquivos:
-		salvar_execucao(fim)
-		return 0
+	if indice is None and SCAN_INDEX_ENABLED:
+		indice = IndiceArquivos()
 
-	logger.info("IMAGENS EM PROCESSAMENTO")
+	# Arquivos já concluídos nesta janela por uma execução interrompida (ou com erros)
+	diario = DiarioExecucao()
+	if len(diario):
+		logger.info(f"Diário de execução: {len(diario)} arquivo(s) já concluído(s) nesta janela")
+
+	# Arquivos que ainda estavam em cópia no fim da execução anterior
+	pendentes = []
+	for arquivo in obter_pendentes():
+		try:
+			pendentes.append((_referencia(arquivo), arquivo))
+		except OSError:
+			continue
+	if pendentes:
+		logger.info(f"Arquivos pendentes da execução anterior: {len(pendentes)}")
 
 	processadas = 0
+	ignoradas = 0
 	erros = 0
-	for arquivo in arquivos:
-		try:
-			copiar_imagem(arquivo)
-			processadas += 1
-		except Exception as exc:
-			logger.error(f"Erro ao processar {arquivo.name}: {exc}")
-			erros += 1
-
-	if erros == 0:
-		logger.success(f"IMAGENS PROCESSADAS: {processadas}")
-	else:
-		logger.error(f"IMAGENS PROCESSADAS: {processadas} | ERROS: {erros}")
+	retomadas = 0
+	drenada = False
+	# Data de referência dos arquivos com erro transitório: a janela não avança além deles
+	falhas: List[tuple[datetime, Path]] = []
+	# Arquivos que não decodificam não seguram a janela: vão para a quarentena do estado
+	invalidos = obter_invalidos()
+	quarentena_inicial = dict(invalidos)
+	# Imagens mais novas que o fim da janela: ficam para a próxima execução
+	posteriores: List[Path] = []
+	lock_contadores = threading.Lock()
+	# Total de imagens a processar; no pipeline só é conhecido ao fim da varredura
+	total: Optional[int] = None
+
+	try:
+		with (nullcontext(processador) if processador is not None else ProcessadorImagens()) as processador:
+			referencias_adiados: dict[Path, datetime] = {}
+
+			def _processar(registro: tuple[datetime, Path]) -> None:
+				nonlocal processadas, ignoradas, erros
+				referencia, arquivo = registro
+				try:
+					resultado = processador.copiar(arquivo)
+					with lock_contadores:
+						if resultado is not None and resultado.ignorado:
+							ignoradas += 1
+						else:
+							processadas += 1
+						invalidos.pop(str(arquivo), None)
+					diario.registrar(arquivo, referencia)
+				except ArquivoNaoPronto:
+					logger.info(f"Arquivo ainda em cópia, adiado: {arquivo.name}")
+					with lock_contadores:
+						referencias_adiados[arquivo] = referencia
+				except ImagemInvalida as exc:
+					# Tentar de novo não adianta: conta como concluído e só volta se o arquivo mudar
+					logger.error(f"Imagem inválida, em quarentena: {exc}")
+					with lock_contadores:
+						erros += 1
+						invalidos[str(arquivo)] = referencia.isoformat()
+					diario.registrar(arquivo, referencia)
+				except Exception as exc:
+					logger.error(f"Erro ao processar {arquivo.name}: {exc}")
+					with lock_contadores:
+						erros += 1
+						falhas.append(registro)
+				if progresso is not None:
+					with lock_contadores:
+						concluidas = processadas + ignoradas + erros
+					progresso(concluidas, total)
+
+			def _novos(registros: Iterator[tuple[datetime, Path]]) -> Iterator[tuple[datetime, Path]]:
+				nonlocal retomadas
+				for registro in registros:
+					if diario.concluido(registro[1], registro[0]):
+						retomadas += 1
+						continue
+					yield registro
+
+			def _enquanto_ativo(registros) -> Iterator[tuple[datetime, Path]]:
+				# Outra instância pediu drenagem: para de despachar, os em andamento terminam
+				nonlocal drenada
+				for registro in registros:
+					if drenagem_solicitada():
+						drenada = True
+						return
+					yield registro
+
+			conjunto_pendentes = {arquivo for _, arquivo in pendentes}
+
+			if PIPELINE_STREAMING:
+				# Varredura e processamento simultâneos; a ordem é a de descoberta
+				logger.info("IMAGENS EM PROCESSAMENTO (pipeline)")
+				inicio_varredura = time.monotonic()
+				primeira = True
+
+				def _candidatos() -> Iterator[tuple[datetime, Path]]:
+					nonlocal primeira, total
+					encontradas = 0
+					for registro in _novos(iter(pendentes)):
+						encontradas += 1
+						yield registro
+					for registro in _novos(_iterar_imagens_intervalo(origem, inicio, fim, indice, posteriores)):
+						if registro[1] in conjunto_pendentes:
+							continue
+						if primeira:
+							logger.info(f"Primeira imagem enviada ao processamento após {time.monotonic() - inicio_varredura:.1f}s")
+							primeira = False
+						encontradas += 1
+						yield registro
+					total = encontradas
+
+				workers = max(PIPELINE_WORKERS, processador.workers)
+				localizadas = executar_pipeline(_enquanto_ativo(_candidatos()), _processar, workers, PIPELINE_QUEUE_SIZE)
+				logger.info(f"IMAGENS LOCALIZADAS: {localizadas}")
+			else:
+				registros = _listar_imagens_intervalo(origem, inicio, fim, indice, posteriores)
+				registros = pendentes + [registro for registro in registros if registro[1] not in conjunto_pendentes]
+				registros = list(_novos(iter(registros)))
+				localizadas = total = len(registros)
+
+				logger.info(f"IMAGENS LOCALIZADAS: {localizadas}")
+
+				if registros:
+					logger.info("IMAGENS EM PROCESSAMENTO")
+					if processador.workers > 1:
+						# Despacha em ordem de data; os processos terminam fora de ordem
+						executar_pipeline(
+							_enquanto_ativo(registros), _processar, processador.workers, processador.workers * 2
+						)
+					else:
+						for registro in _enquanto_ativo(registros):
+							_processar(registro)
+
+			if retomadas:
+				logger.info(f"IMAGENS JÁ CONCLUÍDAS EM EXECUÇÃO ANTERIOR (puladas): {retomadas}")
+
+			# Nova tentativa, com backoff, dos arquivos que estavam em cópia
+			if processador.prontidao.adiados() and not drenada:
+				logger.info(f"Aguardando {len(processador.prontidao.adiados())} arquivo(s) ainda em cópia...")
+				for arquivo in processador.prontidao.aguardar_adiados(READINESS_MAX_ESPERA):
+					_processar((referencias_adiados.get(arquivo) or _referencia(arquivo), arquivo))
+					if drenagem_solicitada():
+						break
+
+			adiados = processador.prontidao.adiados()
+	except BaseException:
+		# Interrompida: o diário fica como está e a janela não avança
+		diario.fechar()
+		raise
+
+	# Notificações da API ainda em andamento
+	if resumo_api:
+		texto_api = finalizar_envios()
+		if texto_api:
+			logger.info(texto_api)
+
+	if adiados:
+		logger.warning(f"ARQUIVOS ADIADOS PARA A PRÓXIMA EXECUÇÃO: {len(adiados)}")
+	salvar_pendentes(adiados)
+	if invalidos != quarentena_inicial:
+		salvar_invalidos(invalidos)
+
+	if ignoradas:
+		logger.info(f"IMAGENS SEM ALTERAÇÃO (ignoradas): {ignoradas}")
+
+	if localizadas:
+		if erros == 0:
+			logger.success(f"IMAGENS PROCESSADAS: {processadas}")
+		else:
+			logger.error(f"IMAGENS PROCESSADAS: {processadas} | ERROS: {erros}")
 	
-	salvar_execucao(fim)
+	if drenada:
+		# Como numa interrupção: a janela não avança e a próxima instância segue pelo diário
+		logger.warning("DRENAGEM SOLICITADA POR OUTRA INSTÂNCIA: execução encerrada antes do fim da janela")
+		diario.fechar()
+		return processadas
+
+	if indice is not None:
+		indice.salvar(nao_concluidos=[arquivo for _, arquivo in falhas] + adiados + posteriores)
+
+	# A janela só avança até o arquivo mais antigo que falhou; ele (e o que veio depois
+	# dele) volta na próxima execução, e o diário evita refazer o que já foi concluído
+	if falhas:
+		marca = min(fim, min(referencia for referencia, _ in falhas))
+		logger.warning(f"Janela mantida em {marca:%d/%m/%Y %H:%M:%S} por {len(falhas)} arquivo(s) com erro")
+		diario.encerrar(marca)
+		salvar_execucao(marca)
+	else:
+		diario.encerrar()
+		salvar_execucao(fim)
 	return processadas
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+"""
+Outbox persistente das notificações à API de produtos.
+
+Cada produto é gravado na outbox antes do envio e removido quando a API confirma. Uma
+notificação que falhou (API fora do ar, timeout, erro 5xx esgotando as tentativas)
+continua registrada e é reenviada, em lotes, no início da próxima execução, sem
+precisar reprocessar a foto.
+
+Uma rejeição definitiva (4xx como 404/400: o produto não existe na API) ou
+`OUTBOX_MAX_TENTATIVAS` falhas seguidas tiram a notificação da fila: ela fica marcada
+como descartada (`descartado_em`) e não é mais reenviada, até uma nova foto do
+produto registrá-la de novo.
+"""
+
+import threading
+from concurrent.futures import wait
+from datetime import datetime
+from typing import List
+
+from config import API_ENABLED, CATALOG_ENABLED, LOG_DIR, OUTBOX_LOTE, OUTBOX_MAX_TENTATIVAS
+from services import catalog_service
+from services.logging_service import get_app_logger
+from utils.db_utils import abrir_banco
+
+logger = get_app_logger()
+OUTBOX_FILE = LOG_DIR / "outbox.db"
+
+_conexao = None
+_lock = threading.Lock()
+
+
+def _obter_conexao():
+	global _conexao
+	if _conexao is None:
+		_conexao = abrir_banco(OUTBOX_FILE)
+		_conexao.execute(
+			"""
+			CREATE TABLE IF NOT EXISTS outbox (
+				produto TEXT PRIMARY KEY,
+				tentativas INTEGER NOT NULL DEFAULT 0,
+				criado_em TEXT NOT NULL,
+				ultima_tentativa TEXT,
+				descartado_em TEXT
+			)
+			"""
+		)
+		colunas = {linha[1] for linha in _conexao.execute("PRAGMA table_info(outbox)")}
+		if "descartado_em" not in colunas:
+			# Outbox criada por uma versão anterior
+			_conexao.execute("ALTER TABLE outbox ADD COLUMN descartado_em TEXT")
+		_conexao.commit()
+	return _conexao
+
+
+def registrar(produto: str) -> bool:
+	"""Grava o produto na outbox antes de notificar a API; retorna False se não conseguiu."""
+	try:
+		with _lock:
+			conexao = _obter_conexao()
+			with conexao:
+				# Uma foto nova reabre a notificação descartada, com as tentativas zeradas
+				conexao.execute(
+					"""
+					INSERT INTO outbox (produto, criado_em) VALUES (?, ?)
+					ON CONFLICT (produto) DO UPDATE SET
+						tentativas = CASE WHEN descartado_em IS NULL THEN tentativas ELSE 0 END,
+						descartado_em = NULL
+					""",
+					(produto, datetime.now().isoformat()),
+				)
+		return True
+	except Exception as exc:
+		logger.warning(f"Não foi possível registrar {produto} na outbox: {exc}")
+		return False
+
+
+def concluir(produto: str, api_ok: bool) -> None:
+	"""
+	Remove o produto da outbox se a API confirmou; senão contabiliza a tentativa.
+
+	Uma rejeição definitiva (4xx) descarta a notificação sem esperar OUTBOX_MAX_TENTATIVAS.
+	"""
+	definitivo = False
+	if not api_ok:
+		# Só chega aqui pelo retorno do cliente, então o api_service já está carregado
+		from services.api_service import obter_cliente
+		definitivo = obter_cliente().rejeitado(produto)
+	try:
+		with _lock:
+			conexao = _obter_conexao()
+			with conexao:
+				if api_ok:
+					conexao.execute("DELETE FROM outbox WHERE produto = ?", (produto,))
+				else:
+					agora = datetime.now().isoformat()
+					conexao.execute(
+						"UPDATE outbox SET tentativas = tentativas + 1, ultima_tentativa = ? WHERE produto = ?",
+						(agora, produto),
+					)
+					linha = conexao.execute("SELECT tentativas FROM outbox WHERE produto = ?", (produto,)).fetchone()
+					if linha is not None and (definitivo or linha[0] >= OUTBOX_MAX_TENTATIVAS):
+						conexao.execute("UPDATE outbox SET descartado_em = ? WHERE produto = ?", (agora, produto))
+						motivo = "rejeitado pela API" if definitivo else f"{linha[0]} tentativas"
+						logger.warning(f"Outbox: notificação do produto {produto} descartada ({motivo})")
+	except Exception as exc:
+		logger.warning(f"Não foi possível atualizar {produto} na outbox: {exc}")
+
+	# Toda resposta da API (envio normal ou reenvio) passa por aqui
+	if CATALOG_ENABLED:
+		catalog_service.atualizar_api(produto, api_ok)
+
+
+def _proximo_lote(depois_de: str, tamanho: int) -> List[tuple]:
+	with _lock:
+		return _obter_conexao().execute(
+			"SELECT produto FROM outbox WHERE descartado_em IS NULL AND produto > ? ORDER BY produto LIMIT ?",
+			(depois_de, tamanho),
+		).fetchall()
+
+
+def pendentes() -> int:
+	"""Quantidade de notificações aguardando confirmação da API."""
+	try:
+		with _lock:
+			return _obter_conexao().execute("SELECT COUNT(*) FROM outbox WHERE descartado_em IS NULL").fetchone()[0]
+	except Exception:
+		return 0
+
+
+def reenviar_pendentes(tamanho_lote: int = OUTBOX_LOTE) -> int:
+	"""
+	Reenvia as notificações pendentes da outbox, em lotes, pelo cliente compartilhado.
+
+	Cada produto é tentado uma vez por chamada (com as repetições do próprio cliente);
+	os que falharem continuam na outbox para a próxima execução.
+
+	Returns:
+		Quantidade de notificações confirmadas pela API
+	"""
+	if not API_ENABLED:
+		return 0
+
+	try:
+		total = pendentes()
+		if total == 0:
+			return 0
+
+		logger.info(f"Outbox: reenviando {total} notificação(ões) pendente(s) à API")
+		# Importado aqui: a pré-verificação do main.py consulta OUTBOX_FILE sem carregar o requests
+		from services.api_service import obter_cliente
+		cliente = obter_cliente()
+		confirmadas = 0
+		ultimo = ""
+		while True:
+			lote = _proximo_lote(ultimo, max(1, tamanho_lote))
+			if not lote:
+				break
+			ultimo = lote[-1][0]
+
+			futuros = [
+				cliente.enviar(produto, lambda ok, produto=produto: concluir(produto, ok))
+				for produto, in lote
+			]
+			wait(futuros)
+			confirmadas += sum(1 for futuro in futuros if not futuro.exception() and futuro.result())
+
+		restantes = pendentes()
+		if restantes:
+			logger.warning(f"Outbox: {confirmadas} confirmada(s), {restantes} continuam pendentes")
+		else:
+			logger.success(f"Outbox: {confirmadas} notificação(ões) confirmada(s)")
+		resumo = cliente.resumo()
+		if resumo:
+			logger.info(resumo)
+		return confirmadas
+	except Exception as exc:
+		logger.error(f"Erro ao reenviar notificações da outbox: {exc}")
+		return 0
+
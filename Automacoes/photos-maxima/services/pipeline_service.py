@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+"""
+Pipeline produtor/consumidor entre a varredura e o processamento de imagens.
+
+A thread chamadora consome o iterador de entrada (a varredura) e coloca cada item em
+uma fila limitada; workers retiram os itens e já começam a processá-los enquanto a
+varredura continua. A fila limitada segura a varredura quando o processamento está
+atrasado, de forma que a memória não cresce com o tamanho da árvore.
+
+O `ProcessadorImagens` executa a etapa de arquivo (decodificar/redimensionar/comprimir)
+no próprio processo ou em um pool de processos (IMAGE_WORKERS), mantendo no processo
+principal o photos.log e as chamadas à API. Um mesmo caminho nunca é processado duas
+vezes ao mesmo tempo (ex.: evento do modo contínuo e varredura de reconciliação).
+"""
+
+import dataclasses
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, TypeVar
+
+from config import IMAGE_WORKERS
+from services import metrics_service
+from services.image_service import ResultadoImagem, processar_imagem, registrar_imagem
+from services.logging_service import get_app_logger
+from services.readiness_service import ArquivoNaoPronto, RastreadorProntidao
+
+logger = get_app_logger()
+
+T = TypeVar("T")
+
+_FIM = object()
+
+
+def executar_pipeline(
+	itens: Iterable[T],
+	processar: Callable[[T], None],
+	workers: int,
+	tamanho_fila: int,
+) -> int:
+	"""
+	Processa os itens à medida que são produzidos.
+
+	Args:
+		itens: Iterador produtor (consumido na thread chamadora)
+		processar: Função executada pelos workers para cada item
+		workers: Quantidade de threads consumidoras
+		tamanho_fila: Capacidade máxima da fila entre produtor e consumidores
+
+	Returns:
+		Quantidade de itens produzidos
+	"""
+	fila: queue.Queue = queue.Queue(maxsize=max(1, tamanho_fila))
+	parar = threading.Event()
+
+	def _consumir():
+		while True:
+			item = fila.get()
+			if item is _FIM:
+				return
+			if parar.is_set():
+				continue
+			try:
+				processar(item)
+			except Exception as exc:
+				logger.error(f"Erro inesperado no worker do pipeline: {exc}")
+
+	threads = [
+		threading.Thread(target=_consumir, daemon=True, name=f"PipelineWorker-{i + 1}")
+		for i in range(max(1, workers))
+	]
+	for thread in threads:
+		thread.start()
+
+	produzidos = 0
+	try:
+		for item in itens:
+			fila.put(item)
+			produzidos += 1
+	except BaseException:
+		# Interrompe os workers: itens ainda na fila são descartados
+		parar.set()
+		raise
+	finally:
+		for _ in threads:
+			fila.put(_FIM)
+		for thread in threads:
+			thread.join()
+
+	return produzidos
+
+
+class ProcessadorImagens:
+	"""Executa a etapa de arquivo das imagens localmente ou em um pool de processos."""
+
+	def __init__(self, workers: int = IMAGE_WORKERS):
+		"""
+		Args:
+			workers: Processos de transcodificação (1 = no próprio processo)
+		"""
+		self.workers = max(1, workers)
+		self.prontidao = RastreadorProntidao()
+		# Caminho -> resultado da chamada em andamento para ele
+		self._em_andamento: Dict[Path, Future] = {}
+		self._lock_andamento = threading.Lock()
+		self._executor: Optional[ProcessPoolExecutor] = None
+		if self.workers > 1:
+			# "spawn" em todas as plataformas: o processo principal já tem threads
+			# (varredura/pipeline) e fork com threads ativas não é seguro
+			self._executor = ProcessPoolExecutor(
+				max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+			)
+			logger.info(f"Pool de transcodificação iniciado com {self.workers} processos")
+
+	def copiar(self, path: Path) -> Optional[ResultadoImagem]:
+		"""
+		Processa uma imagem; pode ser chamado de várias threads ao mesmo tempo.
+
+		Se o mesmo caminho já está sendo processado por outra thread, espera por ela em
+		vez de processá-lo de novo: recebe o mesmo resultado marcado como `ignorado`
+		(ou a mesma exceção).
+
+		Raises:
+			ArquivoNaoPronto: o arquivo ainda está sendo copiado e foi adiado em `prontidao`
+		"""
+		futuro: Future = Future()
+		with self._lock_andamento:
+			em_andamento = self._em_andamento.setdefault(path, futuro)
+		if em_andamento is not futuro:
+			resultado = em_andamento.result()
+			return dataclasses.replace(resultado, ignorado=True) if resultado is not None else None
+
+		try:
+			resultado = self._copiar(path)
+		except BaseException as exc:
+			futuro.set_exception(exc)
+			raise
+		else:
+			futuro.set_result(resultado)
+			return resultado
+		finally:
+			with self._lock_andamento:
+				del self._em_andamento[path]
+
+	def _copiar(self, path: Path) -> Optional[ResultadoImagem]:
+		try:
+			with metrics_service.medir("prontidao"):
+				pronto = self.prontidao.verificar(path)
+		except FileNotFoundError:
+			return None
+		if not pronto:
+			self.prontidao.adiar(path)
+			raise ArquivoNaoPronto(path.name)
+
+		if self._executor is None:
+			resultado = processar_imagem(path)
+		else:
+			resultado = self._executor.submit(processar_imagem, path).result()
+
+		if resultado is not None:
+			registrar_imagem(resultado)
+		return resultado
+
+	def encerrar(self) -> None:
+		"""Finaliza o pool de processos, se houver."""
+		if self._executor is not None:
+			self._executor.shutdown(wait=True, cancel_futures=True)
+			self._executor = None
+
+	def __enter__(self) -> "ProcessadorImagens":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.encerrar()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+"""
+Pré-verificação barata antes de uma execução pontual: há algo para fazer?
+
+A maioria das execuções agendadas não encontra imagens novas. Com o índice de
+varredura habilitado, o mtime de cada diretório da origem no fim da última execução
+já está em `scan_index.db`; se nenhum diretório mudou (nenhuma entrada criada,
+removida ou renomeada), a varredura não teria candidatos. Nesse caso o main.py
+encerra sem importar Pillow/requests, sem lock e sem mensagens no Telegram.
+
+Este módulo usa apenas a biblioteca padrão: nada do processamento de imagens ou da
+API é importado aqui.
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Tuple
+
+from config import API_ENABLED, SCAN_INDEX_ENABLED, SCAN_INDEX_REVALIDAR_HORAS, SCAN_PRECHECK, SOURCE_DIR
+from services.index_service import INDEX_FILE
+from services.outbox_service import OUTBOX_FILE
+from services.state_service import CHECKPOINT_FILE, STATE_FILE
+
+# Notificações descartadas (rejeição definitiva da API) não contam como trabalho
+_SQL_OUTBOX_PENDENTE = "SELECT 1 FROM outbox WHERE descartado_em IS NULL LIMIT 1"
+
+
+def _consultar(caminho: Path, sql: str) -> list:
+	# Somente leitura: não cria o banco nem interfere numa execução em andamento
+	conexao = sqlite3.connect(f"{caminho.as_uri()}?mode=ro", uri=True, timeout=5)
+	try:
+		return conexao.execute(sql).fetchall()
+	finally:
+		conexao.close()
+
+
+def verificar_trabalho() -> Tuple[bool, str]:
+	"""
+	Decide se a execução pontual precisa rodar.
+
+	Na dúvida (índice ausente, erro de leitura), responde que sim.
+
+	Returns:
+		(precisa rodar, motivo)
+	"""
+	if not (SCAN_INDEX_ENABLED and SCAN_PRECHECK):
+		return True, "pré-verificação desligada"
+
+	try:
+		if CHECKPOINT_FILE.exists() and CHECKPOINT_FILE.stat().st_size > 0:
+			return True, "execução anterior interrompida"
+
+		if STATE_FILE.exists() and json.loads(STATE_FILE.read_text(encoding="utf-8")).get("pendentes"):
+			return True, "arquivos pendentes da execução anterior"
+
+		if API_ENABLED and OUTBOX_FILE.exists() and _consultar(OUTBOX_FILE, _SQL_OUTBOX_PENDENTE):
+			return True, "notificações pendentes na outbox"
+
+		if not INDEX_FILE.exists():
+			return True, "índice de varredura inexistente"
+
+		revalidacao = _consultar(INDEX_FILE, "SELECT valor FROM metadados WHERE chave = 'ultima_revalidacao'")
+		if not revalidacao or not revalidacao[0][0]:
+			return True, "índice nunca revalidado"
+		if datetime.now() - datetime.fromisoformat(revalidacao[0][0]) >= timedelta(hours=SCAN_INDEX_REVALIDAR_HORAS):
+			return True, "revalidação completa do índice vencida"
+
+		# Mesmo caminho usado pelo monitorar como raiz do índice
+		origem = str(Path(SOURCE_DIR).expanduser().resolve())
+		diretorios = [
+			(caminho, mtime)
+			for caminho, mtime in _consultar(INDEX_FILE, "SELECT caminho, mtime FROM diretorios")
+			if caminho == origem or caminho.startswith(origem + os.sep)
+		]
+		if not any(caminho == origem for caminho, _ in diretorios):
+			return True, "origem ainda não indexada"
+
+		for caminho, mtime in diretorios:
+			try:
+				if os.stat(caminho).st_mtime != mtime:
+					return True, f"diretório alterado: {caminho}"
+			except FileNotFoundError:
+				return True, f"diretório removido: {caminho}"
+	except (OSError, ValueError, sqlite3.Error) as exc:
+		return True, f"falha na pré-verificação ({exc})"
+
+	return False, f"{len(diretorios)} diretório(s) sem alteração"
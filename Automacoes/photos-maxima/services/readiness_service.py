@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+"""
+Detecção, sem bloqueio, de arquivos que ainda estão sendo copiados para a origem.
+
+Um arquivo é considerado pronto quando pode ser aberto para leitura e seu (tamanho,
+mtime, ctime) está estável: ou a última alteração — max(mtime, ctime), como na data de
+referência da varredura — já é antiga, ou a mesma assinatura foi observada há pelo
+menos READINESS_ESTAVEL_SEGUNDOS. O mtime sozinho não basta: cópias que preservam o
+mtime original (robocopy, cp -p, Explorer) chegam com ele antigo ainda no meio da
+gravação, mas o ctime delas é recente. Arquivos não prontos são adiados e verificados
+de novo com backoff exponencial, enquanto os demais continuam sendo processados.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import READINESS_ESTAVEL_SEGUNDOS
+from services import metrics_service
+from services.logging_service import get_app_logger
+
+logger = get_app_logger()
+
+_BACKOFF_INICIAL = 1.0
+_BACKOFF_MAXIMO = 15.0
+
+
+class ArquivoNaoPronto(Exception):
+	"""O arquivo ainda está sendo gravado na origem; deve ser tentado mais tarde."""
+
+
+@dataclass
+class _Adiado:
+	tentativas: int
+	proxima_verificacao: float
+
+
+class RastreadorProntidao:
+	"""Acompanha a estabilidade dos arquivos e a fila de arquivos adiados."""
+
+	def __init__(self, estabilidade: float = READINESS_ESTAVEL_SEGUNDOS):
+		self.estabilidade = estabilidade
+		self._observacoes: Dict[Path, Tuple[Tuple[int, float, float], float]] = {}
+		self._adiados: Dict[Path, _Adiado] = {}
+		self._lock = threading.Lock()
+
+	def verificar(self, path: Path) -> bool:
+		"""Verifica (uma única vez, sem esperar) se o arquivo está pronto para leitura."""
+		try:
+			stat_info = path.stat()
+		except FileNotFoundError:
+			raise
+		except OSError:
+			return False
+
+		ctime = getattr(stat_info, "st_ctime", stat_info.st_mtime)
+		assinatura = (stat_info.st_size, stat_info.st_mtime, ctime)
+		agora = time.monotonic()
+		with self._lock:
+			anterior = self._observacoes.get(path)
+			if anterior is None or anterior[0] != assinatura:
+				self._observacoes[path] = (assinatura, agora)
+				desde = agora
+			else:
+				desde = anterior[1]
+
+		estavel = (
+			time.time() - max(stat_info.st_mtime, ctime) >= self.estabilidade
+			or agora - desde >= self.estabilidade
+		)
+		if not estavel:
+			return False
+
+		# Em compartilhamentos Windows o arquivo em cópia fica bloqueado para leitura
+		try:
+			with open(path, "rb") as f:
+				f.read(1)
+		except (PermissionError, OSError):
+			return False
+
+		with self._lock:
+			self._observacoes.pop(path, None)
+			# Pronto por outro caminho (ex.: próximo ciclo do modo agendado): sai da fila
+			self._adiados.pop(path, None)
+		return True
+
+	def adiar(self, path: Path) -> None:
+		"""Coloca o arquivo na fila de nova tentativa com backoff exponencial."""
+		with self._lock:
+			adiado = self._adiados.get(path)
+			tentativas = adiado.tentativas + 1 if adiado else 1
+			espera = min(_BACKOFF_INICIAL * 2 ** (tentativas - 1), _BACKOFF_MAXIMO)
+			self._adiados[path] = _Adiado(tentativas, time.monotonic() + espera)
+
+	def prontos_adiados(self) -> List[Path]:
+		"""Retira da fila e devolve os adiados que ficaram prontos (sem esperar)."""
+		agora = time.monotonic()
+		with self._lock:
+			vencidos = [path for path, adiado in self._adiados.items() if adiado.proxima_verificacao <= agora]
+
+		prontos = []
+		for path in vencidos:
+			try:
+				pronto = self.verificar(path)
+			except FileNotFoundError:
+				# Removido (ou renomeado) antes de terminar a cópia
+				with self._lock:
+					self._adiados.pop(path, None)
+				continue
+			if pronto:
+				with self._lock:
+					self._adiados.pop(path, None)
+				prontos.append(path)
+			else:
+				self.adiar(path)
+		return prontos
+
+	def aguardar_adiados(self, max_espera: float) -> Iterator[Path]:
+		"""Devolve os adiados conforme ficam prontos, por no máximo `max_espera` segundos."""
+		limite = time.monotonic() + max_espera
+		while True:
+			yield from self.prontos_adiados()
+
+			proxima = self._proxima_verificacao()
+			if proxima is None or proxima > limite:
+				return
+			with metrics_service.medir("espera_arquivos_em_copia"):
+				time.sleep(max(0.0, proxima - time.monotonic()))
+
+	def _proxima_verificacao(self) -> Optional[float]:
+		with self._lock:
+			if not self._adiados:
+				return None
+			return min(adiado.proxima_verificacao for adiado in self._adiados.values())
+
+	def adiados(self) -> List[Path]:
+		"""Arquivos que continuam adiados."""
+		with self._lock:
+			return list(self._adiados)
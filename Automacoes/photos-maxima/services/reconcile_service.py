@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+"""
+Reconciliação origem × destino (python main.py --reconciliar).
+
+A execução normal só enxerga arquivos cuja data de referência cai na janela do dia:
+fotos copiadas preservando um mtime antigo, ou que chegaram com o serviço parado na
+virada do dia, nunca entram. A reconciliação compara a origem inteira com o destino:
+
+1. manifesto da origem: (produto, data de referência, arquivo), ordenado por produto;
+   se houver mais de um arquivo para o mesmo produto, vale o mais recente;
+2. manifesto do destino: (produto, mtime de cada rendição), ordenado por produto,
+   ignorando backups (`.bkp.*`) e temporários (`.tmp`);
+3. junção por ordenação (merge join) dos dois em uma única passagem linear.
+
+Só produtos sem alguma rendição no destino, ou com a origem mais nova que a rendição
+mais antiga, vão ao pool de processamento. O manifesto de conteúdo ainda evita
+recodificar uma origem apenas "tocada".
+"""
+
+import heapq
+import os
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import PIPELINE_WORKERS, READINESS_MAX_ESPERA
+from services.api_service import finalizar_envios
+from services.image_service import RENDICOES, ImagemInvalida, Rendicao
+from services.lock_service import drenagem_solicitada
+from services.logging_service import get_app_logger
+from services.pipeline_service import ProcessadorImagens, executar_pipeline
+from services.readiness_service import ArquivoNaoPronto
+from services.scan_service import varrer_imagens
+from services.state_service import obter_invalidos, obter_pendentes, salvar_invalidos, salvar_pendentes
+
+logger = get_app_logger()
+
+
+def _manifesto_origem(origem: Path) -> List[Tuple[str, float, Path]]:
+	"""(produto, data de referência, arquivo) de cada produto da origem, ordenado por produto."""
+	mais_recentes: Dict[str, Tuple[float, Path]] = {}
+	for arquivo, referencia in varrer_imagens(origem):
+		produto = arquivo.stem
+		instante = referencia.timestamp()
+		atual = mais_recentes.get(produto)
+		if atual is None or instante > atual[0]:
+			mais_recentes[produto] = (instante, arquivo)
+	return sorted((produto, instante, arquivo) for produto, (instante, arquivo) in mais_recentes.items())
+
+
+def _listar_rendicao(rendicao: Rendicao) -> List[Tuple[str, float]]:
+	"""(produto, mtime) dos arquivos de uma rendição no destino, ordenado por produto."""
+	extensao = rendicao.extensao
+	arquivos = []
+	try:
+		with os.scandir(rendicao.pasta) as entradas:
+			for entrada in entradas:
+				nome = entrada.name
+				# Temporários da publicação atômica começam com "." e terminam em .tmp
+				if nome.startswith(".") or not nome.lower().endswith(extensao):
+					continue
+				produto = nome[: -len(extensao)]
+				if produto.endswith(".bkp"):
+					continue
+				try:
+					if entrada.is_file():
+						arquivos.append((produto, entrada.stat().st_mtime))
+				except OSError:
+					continue
+	except FileNotFoundError:
+		return []
+	arquivos.sort()
+	return arquivos
+
+
+def _manifesto_destino(rendicoes: List[Rendicao]) -> Iterator[Tuple[str, Dict[Rendicao, float]]]:
+	"""(produto, {rendição: mtime}) do destino, ordenado por produto (merge das rendições)."""
+	def _com_rendicao(rendicao: Rendicao) -> Iterator[Tuple[str, float, Rendicao]]:
+		for produto, mtime in _listar_rendicao(rendicao):
+			yield produto, mtime, rendicao
+
+	listas = [_com_rendicao(rendicao) for rendicao in rendicoes]
+	atual: Optional[str] = None
+	saidas: Dict[Rendicao, float] = {}
+	for produto, mtime, rendicao in heapq.merge(*listas, key=lambda item: item[0]):
+		if produto != atual:
+			if atual is not None:
+				yield atual, saidas
+			atual, saidas = produto, {}
+		saidas[rendicao] = mtime
+	if atual is not None:
+		yield atual, saidas
+
+
+def comparar(
+	origem: List[Tuple[str, float, Path]],
+	destino: Iterator[Tuple[str, Dict[Rendicao, float]]],
+	rendicoes: List[Rendicao],
+) -> Tuple[List[Path], List[Path], int, int]:
+	"""
+	Junta os dois manifestos ordenados por produto em uma única passagem.
+
+	Returns:
+		(arquivos sem alguma rendição, arquivos com rendição desatualizada,
+		produtos em dia, produtos só no destino)
+	"""
+	faltantes: List[Path] = []
+	desatualizados: List[Path] = []
+	em_dia = 0
+	orfaos = 0
+
+	destino = iter(destino)
+	item_destino = next(destino, None)
+	for produto, referencia, arquivo in origem:
+		while item_destino is not None and item_destino[0] < produto:
+			orfaos += 1
+			item_destino = next(destino, None)
+
+		if item_destino is None or item_destino[0] != produto or len(item_destino[1]) < len(rendicoes):
+			faltantes.append(arquivo)
+		elif referencia > min(item_destino[1].values()):
+			desatualizados.append(arquivo)
+		else:
+			em_dia += 1
+
+		if item_destino is not None and item_destino[0] == produto:
+			item_destino = next(destino, None)
+
+	while item_destino is not None:
+		orfaos += 1
+		item_destino = next(destino, None)
+
+	return faltantes, desatualizados, em_dia, orfaos
+
+
+def _marcar_em_dia(arquivo: Path) -> None:
+	"""Origem só "tocada" (conteúdo igual): atualiza o mtime das saídas para a próxima comparação."""
+	for rendicao in RENDICOES:
+		try:
+			os.utime(rendicao.destino(arquivo.stem))
+		except OSError:
+			continue
+
+
+def reconciliar(
+	diretorio: str,
+	processador: Optional[ProcessadorImagens] = None,
+	progresso: Optional[Callable[[int, Optional[int]], None]] = None,
+) -> int:
+	"""
+	Processa as imagens da origem que faltam ou estão desatualizadas no destino.
+
+	Args:
+		diretorio: Diretório de origem
+		processador: Processador já iniciado (modo agendado); se None, um novo é criado
+		progresso: Chamado a cada imagem concluída com (concluídas, total)
+
+	Returns:
+		Quantidade de imagens processadas
+	"""
+	origem = Path(diretorio).expanduser().resolve()
+	if not origem.exists():
+		logger.error(f"Diretório de origem não encontrado: {origem}")
+		raise FileNotFoundError(f"Diretório não encontrado: {origem}")
+
+	logger.info("RECONCILIAÇÃO ORIGEM × DESTINO")
+	inicio = time.monotonic()
+	manifesto_origem = _manifesto_origem(origem)
+	faltantes, desatualizados, em_dia, orfaos = comparar(manifesto_origem, _manifesto_destino(RENDICOES), RENDICOES)
+	logger.info(
+		f"Reconciliação: {len(manifesto_origem)} produto(s) na origem em {time.monotonic() - inicio:.1f}s | "
+		f"em dia: {em_dia} | sem foto no destino: {len(faltantes)} | desatualizados: {len(desatualizados)} | "
+		f"só no destino: {orfaos}"
+	)
+
+	# Arquivos em quarentena (não decodificam) só voltam se foram substituídos na origem
+	invalidos = obter_invalidos()
+	quarentena_inicial = dict(invalidos)
+	referencias = {arquivo: datetime.fromtimestamp(instante).isoformat() for _, instante, arquivo in manifesto_origem}
+	pendentes = [arquivo for arquivo in faltantes + desatualizados if invalidos.get(str(arquivo)) != referencias[arquivo]]
+	if len(pendentes) < len(faltantes) + len(desatualizados):
+		logger.info(f"Reconciliação: {len(faltantes) + len(desatualizados) - len(pendentes)} arquivo(s) inválido(s) em quarentena")
+	if not pendentes:
+		return 0
+
+	processadas = 0
+	ignoradas = 0
+	erros = 0
+	drenada = False
+	# Arquivos desta reconciliação ainda em cópia
+	em_copia: set = set()
+	lock_contadores = threading.Lock()
+
+	with (nullcontext(processador) if processador is not None else ProcessadorImagens()) as processador_ativo:
+
+		def _processar(arquivo: Path) -> None:
+			nonlocal processadas, ignoradas, erros
+			try:
+				resultado = processador_ativo.copiar(arquivo)
+				if resultado is not None and resultado.ignorado:
+					_marcar_em_dia(arquivo)
+				with lock_contadores:
+					em_copia.discard(arquivo)
+					if resultado is not None and resultado.ignorado:
+						ignoradas += 1
+					else:
+						processadas += 1
+					invalidos.pop(str(arquivo), None)
+			except ArquivoNaoPronto:
+				logger.info(f"Arquivo ainda em cópia, adiado: {arquivo.name}")
+				with lock_contadores:
+					em_copia.add(arquivo)
+			except ImagemInvalida as exc:
+				logger.error(f"Imagem inválida, em quarentena: {exc}")
+				with lock_contadores:
+					em_copia.discard(arquivo)
+					erros += 1
+					invalidos[str(arquivo)] = referencias[arquivo]
+			except Exception as exc:
+				logger.error(f"Erro ao processar {arquivo.name}: {exc}")
+				with lock_contadores:
+					em_copia.discard(arquivo)
+					erros += 1
+			if progresso is not None:
+				with lock_contadores:
+					concluidas = processadas + ignoradas + erros + len(em_copia)
+				progresso(concluidas, len(pendentes))
+
+		def _enquanto_ativo() -> Iterator[Path]:
+			nonlocal drenada
+			for arquivo in pendentes:
+				if drenagem_solicitada():
+					logger.warning("Drenagem solicitada por outra instância: reconciliação interrompida")
+					drenada = True
+					return
+				yield arquivo
+
+		workers = max(PIPELINE_WORKERS, processador_ativo.workers)
+		executar_pipeline(_enquanto_ativo(), _processar, workers, workers * 2)
+
+		# Nova tentativa, com backoff, dos arquivos que estavam em cópia
+		if em_copia and not drenada:
+			logger.info(f"Aguardando {len(em_copia)} arquivo(s) ainda em cópia...")
+			for arquivo in processador_ativo.prontidao.aguardar_adiados(READINESS_MAX_ESPERA):
+				# O processador do modo agendado também guarda os adiados do monitorar
+				if arquivo in em_copia:
+					_processar(arquivo)
+				if drenagem_solicitada():
+					break
+		adiados = sorted(em_copia)
+
+	# Notificações da API ainda em andamento
+	resumo_api = finalizar_envios()
+	if resumo_api:
+		logger.info(resumo_api)
+
+	if invalidos != quarentena_inicial:
+		salvar_invalidos(invalidos)
+	if ignoradas:
+		logger.info(f"RECONCILIAÇÃO: {ignoradas} imagem(ns) sem alteração de conteúdo (não recodificadas)")
+	if adiados:
+		# Entram nos pendentes do estado: a próxima execução (pontual ou ciclo) os processa
+		logger.warning(f"RECONCILIAÇÃO: {len(adiados)} arquivo(s) ainda em cópia; ficam para a próxima execução")
+		salvar_pendentes(list(dict.fromkeys(obter_pendentes() + adiados)))
+	if erros == 0:
+		logger.success(f"IMAGENS PROCESSADAS (reconciliação): {processadas}")
+	else:
+		logger.error(f"IMAGENS PROCESSADAS (reconciliação): {processadas} | ERROS: {erros}")
+	return processadas
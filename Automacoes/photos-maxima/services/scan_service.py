@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+"""
+Varredura paralela da árvore de origem baseada em os.scandir.
+
+Cada diretório é listado uma única vez por uma thread do pool; os dados de tipo e stat
+já trazidos pelo DirEntry são reaproveitados (no Windows o stat vem junto com a
+listagem, sem nova ida ao servidor). Em compartilhamentos de rede a latência de cada
+listagem é distribuída entre os workers em vez de ser paga em série.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Tuple, TypeVar
+
+from config import EXTS, SCAN_WORKERS
+from services.logging_service import get_app_logger
+
+logger = get_app_logger()
+
+T = TypeVar("T")
+
+
+@dataclass
+class _ListagemDiretorio:
+	"""Imagens e subdiretórios encontrados em um diretório."""
+	subdiretorios: List[str] = field(default_factory=list)
+	imagens: List[Tuple[str, float]] = field(default_factory=list)
+	entradas: int = 0
+
+
+def percorrer(
+	raiz: str,
+	visitar: Callable[[str], T],
+	subdiretorios: Callable[[T], Iterable[str]],
+	workers: int = SCAN_WORKERS,
+) -> Iterator[T]:
+	"""
+	Visita a árvore a partir de `raiz` distribuindo os diretórios em um pool de threads.
+
+	Args:
+		raiz: Diretório inicial
+		visitar: Função executada no worker para cada diretório
+		subdiretorios: Extrai do resultado da visita os subdiretórios a visitar
+		workers: Quantidade de threads de listagem
+
+	Returns:
+		Iterador com o resultado de cada visita, na ordem em que terminam.
+		Diretórios inacessíveis são ignorados.
+	"""
+	with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ScanWorker") as executor:
+		pendentes = {executor.submit(visitar, raiz)}
+		try:
+			while pendentes:
+				concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+				for futuro in concluidos:
+					try:
+						resultado = futuro.result()
+					except (PermissionError, OSError):
+						continue
+					for subdiretorio in subdiretorios(resultado):
+						pendentes.add(executor.submit(visitar, subdiretorio))
+					yield resultado
+		finally:
+			for futuro in pendentes:
+				futuro.cancel()
+
+
+def _listar_diretorio(diretorio: str) -> _ListagemDiretorio:
+	"""Lista um diretório reaproveitando os dados em cache do DirEntry."""
+	listagem = _ListagemDiretorio()
+	with os.scandir(diretorio) as entradas:
+		for entrada in entradas:
+			listagem.entradas += 1
+			try:
+				# Link para diretório não é seguido: um link para um ancestral prenderia a varredura em ciclo
+				if entrada.is_dir(follow_symlinks=False):
+					listagem.subdiretorios.append(entrada.path)
+					continue
+				if os.path.splitext(entrada.name)[1].lower() not in EXTS:
+					continue
+				if not entrada.is_file():
+					continue
+
+				stat_info = entrada.stat()
+			except (PermissionError, OSError):
+				continue
+
+			referencia = max(stat_info.st_mtime, getattr(stat_info, "st_ctime", stat_info.st_mtime))
+			listagem.imagens.append((entrada.path, referencia))
+	return listagem
+
+
+def varrer_imagens(origem: Path, workers: int = SCAN_WORKERS) -> Iterator[Tuple[Path, datetime]]:
+	"""Percorre a origem em paralelo e devolve (arquivo, data de referência) de cada imagem."""
+	inicio = time.monotonic()
+	contador = 0
+	proximo_log = 1000
+
+	for listagem in percorrer(str(origem), _listar_diretorio, lambda l: l.subdiretorios, workers):
+		contador += listagem.entradas
+		# Log de progresso a cada 1000 arquivos verificados
+		if contador >= proximo_log:
+			logger.info(f"Verificados {contador} arquivos...")
+			proximo_log = (contador // 1000 + 1) * 1000
+
+		for caminho, referencia in listagem.imagens:
+			yield Path(caminho), datetime.fromtimestamp(referencia)
+
+	duracao = time.monotonic() - inicio
+	taxa = contador / duracao if duracao > 0 else 0
+	logger.info(
+		f"Busca concluída. Total de arquivos verificados: {contador} "
+		f"({taxa:.0f} entradas/s, {workers} workers)"
+	)
@@ -1,198 +1,277 @@
 # services/scheduler_service.py
-import time
+"""
+Agendador de tarefas em processo: tarefas por intervalo fixo ou por expressão cron.
+
+As tarefas rodam uma de cada vez, na thread do agendador (ou na thread que chamou
+`executar`), então uma execução longa de `monitorar` nunca se sobrepõe à seguinte.
+Se uma execução atrasar a próxima, `politica_atraso` define o que fazer com as
+ocorrências perdidas:
+
+- executar: roda uma única vez assim que possível (as perdidas viram uma só);
+- pular: descarta as perdidas e aguarda a próxima ocorrência no horário.
+
+A espera usa um `threading.Event`: `parar()` interrompe o agendador na hora, sem
+esperar o fim de um sleep.
+"""
 import threading
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Set
 from config import TELEGRAM_ENABLED
 from services.logging_service import get_app_logger
 from services.telegram_service import TelegramService
 
 logger = get_app_logger()
 
+POLITICAS_ATRASO = {"executar", "pular"}
+# Com `deve_parar`, a condição é consultada pelo menos uma vez a cada N segundos
+_INTERVALO_CONDICAO = 1.0
+
+
+def _campo_cron(texto: str, minimo: int, maximo: int) -> Set[int]:
+	"""Interpreta um campo cron: *, */n, a, a-b, a-b/n e listas separadas por vírgula."""
+	valores: Set[int] = set()
+	for parte in texto.split(","):
+		faixa, _, passo = parte.partition("/")
+		passo_valor = int(passo) if passo else 1
+		if faixa == "*":
+			inicio, fim = minimo, maximo
+		elif "-" in faixa:
+			inicio, fim = (int(valor) for valor in faixa.split("-", 1))
+		else:
+			inicio = int(faixa)
+			fim = maximo if passo else inicio
+		if inicio < minimo or fim > maximo or inicio > fim or passo_valor < 1:
+			raise ValueError(f"Campo cron inválido: {texto}")
+		valores.update(range(inicio, fim + 1, passo_valor))
+	return valores
+
+
+class Cron:
+	"""Expressão cron de 5 campos: minuto hora dia-do-mês mês dia-da-semana (0 = domingo)."""
+
+	def __init__(self, expressao: str):
+		campos = expressao.split()
+		if len(campos) != 5:
+			raise ValueError(f"Expressão cron deve ter 5 campos: {expressao}")
+		self.expressao = expressao
+		self.minutos = _campo_cron(campos[0], 0, 59)
+		self.horas = _campo_cron(campos[1], 0, 23)
+		self.dias = _campo_cron(campos[2], 1, 31)
+		self.meses = _campo_cron(campos[3], 1, 12)
+		# 7 também é domingo
+		self.dias_semana = {dia % 7 for dia in _campo_cron(campos[4], 0, 7)}
+		# Como no cron: com dia do mês e dia da semana restritos, vale qualquer um dos dois
+		self._dia_restrito = campos[2] != "*"
+		self._semana_restrita = campos[4] != "*"
+
+	def _dia_confere(self, data: datetime) -> bool:
+		dia_semana = (data.weekday() + 1) % 7
+		if self._dia_restrito and self._semana_restrita:
+			return data.day in self.dias or dia_semana in self.dias_semana
+		return data.day in self.dias and dia_semana in self.dias_semana
+
+	def proxima(self, depois_de: datetime) -> datetime:
+		"""Primeira ocorrência estritamente depois de `depois_de`."""
+		data = depois_de.replace(second=0, microsecond=0) + timedelta(minutes=1)
+		limite = data + timedelta(days=366 * 5)
+		while data < limite:
+			if data.month not in self.meses:
+				data = (data.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+			elif not self._dia_confere(data):
+				data = data.replace(hour=0, minute=0) + timedelta(days=1)
+			elif data.hour not in self.horas:
+				data = data.replace(minute=0) + timedelta(hours=1)
+			elif data.minute not in self.minutos:
+				data += timedelta(minutes=1)
+			else:
+				return data
+		raise ValueError(f"Expressão cron sem ocorrências: {self.expressao}")
+
+	def __str__(self) -> str:
+		return f"cron '{self.expressao}'"
+
+
+class Intervalo:
+	"""Execução a cada N segundos, contados do horário previsto da execução anterior."""
+
+	def __init__(self, segundos: float):
+		if segundos <= 0:
+			raise ValueError("O intervalo deve ser maior que zero")
+		self.segundos = segundos
+
+	def proxima(self, depois_de: datetime) -> datetime:
+		return depois_de + timedelta(seconds=self.segundos)
+
+	def __str__(self) -> str:
+		return f"a cada {self.segundos:.0f}s"
+
+
+@dataclass
+class Tarefa:
+	nome: str
+	funcao: Callable[[], object]
+	gatilho: object  # Cron ou Intervalo
+	politica_atraso: str = "executar"
+	proxima: datetime = field(default_factory=datetime.now)
+	execucoes: int = 0
+
 
 class SchedulerService:
-	"""Serviço para agendar execuções em horários específicos."""
+	"""Agendador de tarefas por intervalo e por cron, com parada imediata por evento."""
 
 	def __init__(self):
 		self.running = False
 		self.thread = None
-		self.telegram_service = None
+		self._tarefas: List[Tarefa] = []
+		self._parar = threading.Event()
 		self._lock = threading.Lock()
-		
-		if TELEGRAM_ENABLED:
-			try:
-				self.telegram_service = TelegramService()
-			except Exception as e:
-				logger.warning(f"Erro ao inicializar Telegram Service no scheduler: {e}")
-
-	def _calcular_proxima_hora_cheia(self) -> datetime:
-		"""
-		Calcula o próximo horário de hora cheia.
-		
-		Returns:
-			datetime do próximo horário de hora cheia
-		"""
-		agora = datetime.now()
-		proxima_hora = agora.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-		return proxima_hora
 
-	def _calcular_segundos_ate_proxima_hora(self) -> float:
+	def adicionar_intervalo(
+		self,
+		nome: str,
+		segundos: float,
+		funcao: Callable[[], object],
+		politica_atraso: str = "executar",
+		imediata: bool = True,
+	) -> Tarefa:
 		"""
-		Calcula quantos segundos faltam até a próxima hora cheia.
-		
-		Returns:
-			Número de segundos até a próxima hora cheia
+		Agenda `funcao` a cada `segundos`.
+
+		Args:
+			imediata: Executa já na partida (senão, só depois do primeiro intervalo)
 		"""
-		proxima_hora = self._calcular_proxima_hora_cheia()
+		gatilho = Intervalo(segundos)
 		agora = datetime.now()
-		delta = (proxima_hora - agora).total_seconds()
-		return max(0, delta)
+		return self._adicionar(Tarefa(nome, funcao, gatilho, politica_atraso, agora if imediata else gatilho.proxima(agora)))
+
+	def adicionar_cron(
+		self,
+		nome: str,
+		expressao: str,
+		funcao: Callable[[], object],
+		politica_atraso: str = "executar",
+	) -> Tarefa:
+		"""Agenda `funcao` nos horários da expressão cron (ex.: "*/10 7-19 * * 1-5")."""
+		gatilho = Cron(expressao)
+		return self._adicionar(Tarefa(nome, funcao, gatilho, politica_atraso, gatilho.proxima(datetime.now())))
 
-	def _executar_notificacao(self):
-		"""Executa a notificação do Telegram."""
-		if not self.telegram_service:
+	def _adicionar(self, tarefa: Tarefa) -> Tarefa:
+		if tarefa.politica_atraso not in POLITICAS_ATRASO:
+			logger.warning(f"[SCHEDULER] Política de atraso inválida ({tarefa.politica_atraso}); usando 'executar'")
+			tarefa.politica_atraso = "executar"
+		with self._lock:
+			self._tarefas.append(tarefa)
+		logger.info(
+			f"[SCHEDULER] Tarefa '{tarefa.nome}' agendada ({tarefa.gatilho}); "
+			f"primeira execução: {tarefa.proxima.strftime('%d/%m/%Y %H:%M:%S')}"
+		)
+		return tarefa
+
+	def _reagendar(self, tarefa: Tarefa) -> None:
+		"""Calcula a próxima execução aplicando a política de atraso."""
+		agora = datetime.now()
+		proxima = tarefa.gatilho.proxima(tarefa.proxima)
+		if proxima > agora:
+			tarefa.proxima = proxima
 			return
-			
+
+		if tarefa.politica_atraso == "executar":
+			# Todas as ocorrências perdidas viram uma única execução imediata
+			tarefa.proxima = agora
+		else:
+			perdidas = 0
+			while proxima <= agora:
+				proxima = tarefa.gatilho.proxima(proxima)
+				perdidas += 1
+			logger.warning(f"[SCHEDULER] Tarefa '{tarefa.nome}': {perdidas} execução(ões) perdida(s) descartada(s)")
+			tarefa.proxima = proxima
+
+	def _executar_tarefa(self, tarefa: Tarefa) -> None:
+		logger.info(f"[SCHEDULER] Executando '{tarefa.nome}'")
 		try:
-			self.telegram_service.notificar_execucao_servico("Serviço de Imagens")
-			logger.info("Notificação agendada enviada para o Telegram")
+			tarefa.funcao()
 		except Exception as exc:
-			logger.warning(f"Erro ao executar notificação agendada: {exc}")
-
-	def _loop_agendamento(self):
-		"""Loop principal do agendador."""
-		print("[SCHEDULER] Agendador iniciado. Aguardando próxima hora cheia...")
-		logger.info("[SCHEDULER] Agendador iniciado. Aguardando próxima hora cheia...")
-		
-		while True:
-			# Verificar se deve continuar rodando
-			with self._lock:
-				if not self.running:
+			# Uma execução com erro não derruba o agendador; a próxima segue o horário
+			logger.error(f"[SCHEDULER] Erro na tarefa '{tarefa.nome}': {exc}")
+		tarefa.execucoes += 1
+		self._reagendar(tarefa)
+		logger.info(f"[SCHEDULER] Próxima execução de '{tarefa.nome}': {tarefa.proxima.strftime('%d/%m/%Y %H:%M:%S')}")
+
+	def executar(self, deve_parar: Optional[Callable[[], bool]] = None) -> None:
+		"""
+		Roda as tarefas na thread atual até `parar()` (ou até `deve_parar()` ser True).
+
+		Ctrl+C interrompe normalmente, inclusive no meio de uma tarefa.
+		"""
+		with self._lock:
+			self.running = True
+		self._parar.clear()
+		try:
+			while not self._parar.is_set():
+				if deve_parar is not None and deve_parar():
+					logger.info("[SCHEDULER] Condição de parada atingida.")
 					break
-			
-			try:
-				# Calcular tempo até próxima hora cheia
-				segundos_ate_proxima = self._calcular_segundos_ate_proxima_hora()
-				proxima_hora = self._calcular_proxima_hora_cheia()
-				
-				print(f"[SCHEDULER] Próxima execução: {proxima_hora.strftime('%d/%m/%Y %H:%M:%S')}")
-				print(f"[SCHEDULER] Aguardando {segundos_ate_proxima:.0f} segundos...")
-				logger.info(f"[SCHEDULER] Próxima execução: {proxima_hora.strftime('%d/%m/%Y %H:%M:%S')}")
-				logger.info(f"[SCHEDULER] Aguardando {segundos_ate_proxima:.0f} segundos...")
-				
-				# Aguardar até a próxima hora cheia (com verificação periódica)
-				intervalo_verificacao = min(60, segundos_ate_proxima)  # Verificar a cada minuto ou menos
-				tempo_restante = segundos_ate_proxima
-				
-				while tempo_restante > 0:
-					with self._lock:
-						if not self.running:
-							return
-					
-					sleep_time = min(intervalo_verificacao, tempo_restante)
-					time.sleep(sleep_time)
-					tempo_restante -= sleep_time
-				
-				# Verificar novamente antes de executar
+
 				with self._lock:
-					if not self.running:
-						break
-				
-				# Executar notificação
-				logger.info(f"[SCHEDULER] Executando notificação às {datetime.now().strftime('%H:%M:%S')}...")
-				self._executar_notificacao()
-				
-				# Aguardar 1 segundo para evitar múltiplas execuções no mesmo segundo
-				time.sleep(1)
-				
-			except Exception as exc:
-				logger.error(f"Erro no loop do agendador: {exc}")
-				time.sleep(60)  # Aguardar 1 minuto antes de tentar novamente
-		
-		logger.info("[SCHEDULER] Loop do agendador finalizado.")
+					tarefa = min(self._tarefas, key=lambda t: t.proxima, default=None)
+				if tarefa is None:
+					logger.warning("[SCHEDULER] Nenhuma tarefa agendada.")
+					break
 
-	def _contar_threads_ativas(self) -> int:
-		"""Conta o número de threads ativas."""
-		return threading.active_count()
-	
-	def _limpar_threads_antigas(self):
-		"""Limpa threads antigas do scheduler que possam estar em memória."""
-		# Para a thread atual se estiver rodando
-		if self.thread and self.thread.is_alive():
-			logger.info("[SCHEDULER] Encontrada thread antiga, finalizando...")
+				espera = (tarefa.proxima - datetime.now()).total_seconds()
+				if espera > 0:
+					if deve_parar is not None:
+						espera = min(espera, _INTERVALO_CONDICAO)
+					self._parar.wait(espera)
+					continue
+
+				self._executar_tarefa(tarefa)
+		finally:
 			with self._lock:
 				self.running = False
-			self.thread.join(timeout=5)
-			if self.thread.is_alive():
-				logger.warning("[SCHEDULER] Thread antiga não finalizou no tempo esperado.")
-			else:
-				logger.info("[SCHEDULER] Thread antiga finalizada com sucesso.")
-		
-		# Reset do estado
-		with self._lock:
-			self.running = False
-		self.thread = None
-		
-		# Busca e loga outras threads do scheduler que possam estar rodando (para informação)
-		threads_orfas = []
-		for thread in threading.enumerate():
-			if thread.name == "SchedulerThread" and thread != threading.current_thread():
-				if thread.is_alive():
-					threads_orfas.append(thread.ident)
-		
-		if threads_orfas:
-			logger.warning(f"[SCHEDULER] Encontradas {len(threads_orfas)} thread(s) órfã(s): {threads_orfas}")
-			logger.warning("[SCHEDULER] Threads órfãs serão finalizadas quando o processo terminar (são daemon threads)")
+		logger.info("[SCHEDULER] Loop do agendador finalizado.")
 
 	def iniciar(self):
 		"""Inicia o agendador em uma thread separada."""
-		# Limpa threads antigas antes de iniciar
-		self._limpar_threads_antigas()
-		
-		with self._lock:
-			if self.running:
-				logger.warning("[AVISO] Agendador já está em execução.")
-				return
-			
-			if not TELEGRAM_ENABLED:
-				logger.info("[SCHEDULER] Telegram desabilitado. Agendador não será iniciado.")
-				return
-			
-			self.running = True
-		
-		# Cria nova thread
-		self.thread = threading.Thread(
-			target=self._loop_agendamento,
-			daemon=True,
-			name="SchedulerThread"
-		)
+		if self.thread and self.thread.is_alive():
+			logger.warning("[AVISO] Agendador já está em execução.")
+			return
+
+		self._parar.clear()
+		self.thread = threading.Thread(target=self.executar, daemon=True, name="SchedulerThread")
 		self.thread.start()
-		
-		# Mensagens informativas (como no orders-rejects)
-		print("[SCHEDULER] Agendador iniciado em thread separada.")
-		print(f"[SCHEDULER] Thread ID: {self.thread.ident} | Nome: {self.thread.name}")
-		print(f"[SCHEDULER] Total de threads ativas: {self._contar_threads_ativas()}")
-		print("💡 Dica: Use Ctrl+C para encerrar")
 		logger.info(f"[SCHEDULER] Agendador iniciado em thread separada (ID: {self.thread.ident}, Nome: {self.thread.name})")
 
 	def parar(self):
-		"""Para o agendador."""
-		with self._lock:
-			if not self.running:
-				return
-			self.running = False
-		
-		if self.thread and self.thread.is_alive():
+		"""Para o agendador; uma tarefa em andamento termina antes."""
+		self._parar.set()
+
+		if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
 			logger.info("[SCHEDULER] Aguardando finalização da thread do agendador...")
 			self.thread.join(timeout=10)
 			if self.thread.is_alive():
 				logger.warning("[SCHEDULER] Thread do agendador não finalizou no tempo esperado.")
 			else:
 				logger.info("[SCHEDULER] Thread do agendador finalizada com sucesso.")
-		
+
 		logger.info("[SCHEDULER] Agendador parado.")
-	
+
 	def esta_rodando(self) -> bool:
 		"""Verifica se o agendador está rodando."""
 		with self._lock:
 			return self.running
 
+	def agendar_notificacao(self, expressao: str = "0 * * * *") -> Optional[Tarefa]:
+		"""Agenda a notificação "serviço executado" no Telegram (por padrão, de hora em hora)."""
+		if not TELEGRAM_ENABLED:
+			logger.info("[SCHEDULER] Telegram desabilitado. Notificação periódica não será agendada.")
+			return None
+
+		telegram_service = TelegramService()
+
+		def _notificar():
+			telegram_service.notificar_execucao_servico("Serviço de Imagens")
+			logger.info("Notificação agendada enviada para o Telegram")
+
+		return self.adicionar_cron("notificacao_telegram", expressao, _notificar, politica_atraso="pular")
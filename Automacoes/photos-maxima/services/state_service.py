@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import json
+import os
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Set, Tuple
 
 from config import LOG_DIR
 from services.logging_service import get_app_logger
@@ -12,14 +14,27 @@ logger = get_app_logger()
 STATE_FILE = LOG_DIR / "execution_state.json"
 
 
-def obter_ultima_execucao() -> Optional[datetime]:
-	"""Lê o timestamp da última execução registrada."""
+def _ler_estado() -> dict:
 	if not STATE_FILE.exists():
-		return None
+		return {}
+	return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+
+
+def _gravar_estado(**valores) -> None:
+	"""Atualiza apenas as chaves informadas, preservando as demais."""
+	try:
+		dados = _ler_estado()
+	except Exception:
+		dados = {}
+	dados.update(valores)
+	STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+	STATE_FILE.write_text(json.dumps(dados, ensure_ascii=False, indent=2), encoding="utf-8")
+
 
+def obter_ultima_execucao() -> Optional[datetime]:
+	"""Lê o timestamp da última execução registrada."""
 	try:
-		data = json.loads(STATE_FILE.read_text(encoding="utf-8"))
-		valor = data.get("ultima_execucao")
+		valor = _ler_estado().get("ultima_execucao")
 		if not valor:
 			return None
 		return datetime.fromisoformat(valor)
@@ -31,9 +46,129 @@ def obter_ultima_execucao() -> Optional[datetime]:
 def salvar_execucao(moment: datetime) -> None:
 	"""Atualiza o timestamp da última execução."""
 	try:
-		STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-		payload = {"ultima_execucao": moment.isoformat()}
-		STATE_FILE.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+		_gravar_estado(ultima_execucao=moment.isoformat())
 	except Exception as exc:
 		logger.warning(f"Não foi possível persistir o estado da execução: {exc}")
 
+
+def obter_pendentes() -> List[Path]:
+	"""Arquivos que ainda estavam em cópia no fim da execução anterior."""
+	try:
+		return [Path(caminho) for caminho in _ler_estado().get("pendentes", [])]
+	except Exception as exc:
+		logger.warning(f"Falha ao ler arquivos pendentes: {exc}")
+		return []
+
+
+def salvar_pendentes(arquivos: List[Path]) -> None:
+	"""Registra os arquivos adiados para a próxima execução."""
+	try:
+		_gravar_estado(pendentes=[str(arquivo) for arquivo in arquivos])
+	except Exception as exc:
+		logger.warning(f"Não foi possível persistir os arquivos pendentes: {exc}")
+
+
+def obter_invalidos() -> Dict[str, str]:
+	"""Arquivos em quarentena por não poderem ser decodificados (caminho → data de referência)."""
+	try:
+		return dict(_ler_estado().get("invalidos", {}))
+	except Exception as exc:
+		logger.warning(f"Falha ao ler arquivos inválidos: {exc}")
+		return {}
+
+
+def salvar_invalidos(invalidos: Dict[str, str]) -> None:
+	"""
+	Registra a quarentena de arquivos inválidos.
+
+	Um arquivo sai da quarentena quando volta a ser processado com sucesso; até lá só é
+	tentado de novo se a data de referência mudar (arquivo substituído na origem).
+	"""
+	try:
+		_gravar_estado(invalidos=invalidos)
+	except Exception as exc:
+		logger.warning(f"Não foi possível persistir os arquivos inválidos: {exc}")
+
+
+CHECKPOINT_FILE = LOG_DIR / "checkpoint.jsonl"
+
+
+def _chave(arquivo: Path, referencia: datetime) -> Tuple[str, str]:
+	return str(arquivo), referencia.isoformat()
+
+
+class DiarioExecucao:
+	"""
+	Diário append-only dos arquivos já concluídos na janela em andamento.
+
+	Cada arquivo concluído vira uma linha (caminho + data de referência) gravada na hora.
+	Se a execução for interrompida (ex.: encerrada pelo `criar_lock` da próxima), a
+	janela não avança e a execução seguinte pula exatamente o que já estava no diário.
+	Um arquivo alterado depois de concluído tem outra data de referência e é reprocessado.
+	"""
+
+	def __init__(self, caminho: Path = CHECKPOINT_FILE):
+		self.caminho = caminho
+		self._lock = threading.Lock()
+		self._concluidos: Set[Tuple[str, str]] = set()
+		if caminho.exists():
+			with open(caminho, encoding="utf-8") as arquivo:
+				for linha in arquivo:
+					try:
+						registro = json.loads(linha)
+						self._concluidos.add((registro["caminho"], registro["referencia"]))
+					except (ValueError, KeyError, TypeError):
+						# Última linha incompleta de uma execução encerrada no meio da gravação
+						continue
+		caminho.parent.mkdir(parents=True, exist_ok=True)
+		self._arquivo = open(caminho, "a", encoding="utf-8")
+
+	def __len__(self) -> int:
+		return len(self._concluidos)
+
+	def concluido(self, arquivo: Path, referencia: datetime) -> bool:
+		with self._lock:
+			return _chave(arquivo, referencia) in self._concluidos
+
+	def registrar(self, arquivo: Path, referencia: datetime) -> None:
+		"""Acrescenta o arquivo ao diário (pode ser chamado de várias threads)."""
+		chave = _chave(arquivo, referencia)
+		with self._lock:
+			if chave in self._concluidos or self._arquivo.closed:
+				return
+			self._concluidos.add(chave)
+			self._arquivo.write(json.dumps({"caminho": chave[0], "referencia": chave[1]}, ensure_ascii=False) + "\n")
+			self._arquivo.flush()
+
+	def encerrar(self, marca: Optional[datetime] = None) -> None:
+		"""
+		Fecha o diário ao final de uma execução completa.
+
+		Args:
+			marca: Nova marca d'água da janela; None quando tudo foi concluído (o diário é
+				apagado). Com marca, mantém só as linhas que continuam dentro da próxima janela.
+		"""
+		with self._lock:
+			self._arquivo.close()
+			try:
+				if marca is None:
+					self.caminho.unlink(missing_ok=True)
+					return
+				limite = marca.isoformat()
+				restantes = [chave for chave in self._concluidos if chave[1] >= limite]
+				temporario = self.caminho.with_name(self.caminho.name + ".tmp")
+				temporario.write_text(
+					"".join(
+						json.dumps({"caminho": caminho, "referencia": referencia}, ensure_ascii=False) + "\n"
+						for caminho, referencia in restantes
+					),
+					encoding="utf-8",
+				)
+				os.replace(temporario, self.caminho)
+			except Exception as exc:
+				logger.warning(f"Não foi possível compactar o diário de execução: {exc}")
+
+	def fechar(self) -> None:
+		"""Fecha o arquivo sem alterar o diário (execução interrompida)."""
+		with self._lock:
+			self._arquivo.close()
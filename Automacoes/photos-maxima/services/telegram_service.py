@@ -1,16 +1,37 @@
 # services/telegram_service.py
 """
 Serviço para envio de mensagens via Telegram Bot API.
+
+Todas as instâncias compartilham uma Session (keep-alive, sem novo handshake TLS por
+mensagem). `ProgressoTelegram` mantém uma mensagem de progresso editada no lugar por
+uma thread própria, então quem processa as imagens nunca espera pelo Telegram.
 """
 import requests
 import os
+import threading
+import time
+from requests.adapters import HTTPAdapter
 from typing import Optional
 from datetime import datetime
-from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_TIMEOUT
+from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_TIMEOUT, TELEGRAM_PROGRESS_INTERVAL
 from services.logging_service import get_app_logger
 
 logger = get_app_logger()
 
+_sessao: Optional[requests.Session] = None
+_lock_sessao = threading.Lock()
+
+
+def _obter_sessao() -> requests.Session:
+	"""Session compartilhada por todas as instâncias do serviço."""
+	global _sessao
+	with _lock_sessao:
+		if _sessao is None:
+			_sessao = requests.Session()
+			adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+			_sessao.mount("https://", adapter)
+		return _sessao
+
 
 class TelegramService:
 	"""Serviço para envio de mensagens via Telegram Bot API."""
@@ -25,6 +46,9 @@ class TelegramService:
 		"""
 		self.bot_token = bot_token or TELEGRAM_BOT_TOKEN or os.getenv("TELEGRAM_BOT_TOKEN", "")
 		self.chat_id = chat_id or TELEGRAM_CHAT_ID or os.getenv("TELEGRAM_CHAT_ID", "")
+		self._session = _obter_sessao()
+		# Limite de taxa informado pelo Telegram (HTTP 429): edições ficam suspensas até lá
+		self._bloqueado_ate = 0.0
 
 	def enviar_mensagem(self, mensagem: str, chat_id: Optional[str] = None, parse_mode: str = "HTML") -> Optional[int]:
 		"""
@@ -59,7 +83,7 @@ class TelegramService:
 			payload["parse_mode"] = parse_mode
 		
 		try:
-			response = requests.post(url, json=payload, timeout=TELEGRAM_TIMEOUT)
+			response = self._session.post(url, json=payload, timeout=TELEGRAM_TIMEOUT)
 			response.raise_for_status()
 			result = response.json()
 			if result.get("ok") and "result" in result:
@@ -138,7 +162,7 @@ class TelegramService:
 		}
 		
 		try:
-			response = requests.post(url, json=payload, timeout=TELEGRAM_TIMEOUT)
+			response = self._session.post(url, json=payload, timeout=TELEGRAM_TIMEOUT)
 			response.raise_for_status()
 			result = response.json()
 			return result.get("ok", False)
@@ -152,3 +176,134 @@ class TelegramService:
 					pass
 			return False
 
+
+	def editar_mensagem(self, message_id: int, mensagem: str, chat_id: Optional[str] = None, parse_mode: str = "HTML") -> bool:
+		"""
+		Substitui o texto de uma mensagem já enviada.
+
+		Se o Telegram pedir para esperar (HTTP 429), as edições seguintes são descartadas
+		até o fim do prazo informado em vez de insistir.
+
+		Args:
+			message_id: ID da mensagem a ser editada
+			mensagem: Novo texto
+			chat_id: ID do chat (se None, usa o configurado)
+			parse_mode: Modo de parsing (HTML, Markdown, ou None)
+
+		Returns:
+			True se editada (ou se o texto já era o mesmo), False caso contrário
+		"""
+		chat_id_final = chat_id or self.chat_id
+		if not self.bot_token or not chat_id_final:
+			return False
+		if time.monotonic() < self._bloqueado_ate:
+			return False
+
+		url = f"https://api.telegram.org/bot{self.bot_token}/editMessageText"
+
+		payload = {
+			"chat_id": chat_id_final,
+			"message_id": message_id,
+			"text": mensagem
+		}
+
+		if parse_mode:
+			payload["parse_mode"] = parse_mode
+
+		try:
+			response = self._session.post(url, json=payload, timeout=TELEGRAM_TIMEOUT)
+			if response.status_code == 429:
+				try:
+					espera = int(response.json().get("parameters", {}).get("retry_after", 30))
+				except ValueError:
+					espera = 30
+				self._bloqueado_ate = time.monotonic() + espera
+				logger.warning(f"[TELEGRAM] Limite de taxa atingido; edições suspensas por {espera}s")
+				return False
+			if response.status_code == 400 and "message is not modified" in response.text:
+				return True
+			response.raise_for_status()
+			return response.json().get("ok", False)
+		except requests.RequestException as exc:
+			logger.error(f"[TELEGRAM] Falha ao editar mensagem: {exc}")
+			return False
+
+
+def _formatar_duracao(segundos: float) -> str:
+	segundos = int(segundos)
+	if segundos >= 3600:
+		return f"{segundos // 3600}h{segundos % 3600 // 60:02d}m"
+	if segundos >= 60:
+		return f"{segundos // 60}m{segundos % 60:02d}s"
+	return f"{segundos}s"
+
+
+class ProgressoTelegram:
+	"""
+	Mensagem de progresso (processadas/total, taxa e previsão de término) editada no lugar.
+
+	`atualizar` só guarda os números e pode ser chamado a cada imagem, de qualquer thread;
+	uma thread de fundo edita a mensagem no máximo uma vez a cada `intervalo` segundos e
+	apenas quando algo mudou, respeitando o limite de edições do Telegram.
+	"""
+
+	def __init__(
+		self,
+		telegram: TelegramService,
+		message_id: int,
+		cabecalho: str,
+		intervalo: float = TELEGRAM_PROGRESS_INTERVAL,
+	):
+		self._telegram = telegram
+		self._message_id = message_id
+		self._cabecalho = cabecalho
+		self._intervalo = max(intervalo, 1.0)
+		self._lock = threading.Lock()
+		self._parar = threading.Event()
+		self._inicio = time.monotonic()
+		self._concluidas = 0
+		self._total: Optional[int] = None
+		self._versao = 0
+		self._versao_publicada = 0
+		self._thread = threading.Thread(target=self._executar, name="telegram-progresso", daemon=True)
+		self._thread.start()
+
+	def atualizar(self, concluidas: int, total: Optional[int] = None) -> None:
+		"""Registra o andamento (total None = varredura ainda em curso). Não bloqueia."""
+		with self._lock:
+			self._concluidas = concluidas
+			self._total = total
+			self._versao += 1
+
+	def _texto(self) -> str:
+		with self._lock:
+			concluidas, total = self._concluidas, self._total
+		decorrido = time.monotonic() - self._inicio
+		taxa = concluidas / decorrido if decorrido > 0 else 0.0
+
+		if total:
+			linhas = [f"🖼️ Imagens: {concluidas}/{total} ({concluidas * 100 // total}%)"]
+		else:
+			linhas = [f"🖼️ Imagens: {concluidas} (varredura em andamento)"]
+		linhas.append(f"⚡ Taxa: {taxa:.1f} imagens/s")
+		if total and taxa > 0 and concluidas < total:
+			linhas.append(f"⏳ Previsão: {_formatar_duracao((total - concluidas) / taxa)}")
+		linhas.append(f"🕐 Decorrido: {_formatar_duracao(decorrido)}")
+		return f"{self._cabecalho}\n\n" + "\n".join(linhas)
+
+	def _executar(self) -> None:
+		while not self._parar.wait(self._intervalo):
+			with self._lock:
+				versao = self._versao
+			if versao == self._versao_publicada:
+				continue
+			try:
+				if self._telegram.editar_mensagem(self._message_id, self._texto()):
+					self._versao_publicada = versao
+			except Exception as exc:
+				logger.error(f"[TELEGRAM] Erro ao atualizar progresso: {exc}")
+
+	def encerrar(self) -> None:
+		"""Para a thread de atualização (a mensagem fica com o último progresso publicado)."""
+		self._parar.set()
+		self._thread.join(timeout=TELEGRAM_TIMEOUT + 1)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+"""
+Modo contínuo (daemon): monitora a origem em tempo real.
+
+Os eventos do sistema de arquivos passam pelo `Handler`, que agrupa e aguarda cada
+caminho estabilizar; os caminhos prontos vão para um pool de workers. Como eventos
+podem se perder em compartilhamentos de rede, uma varredura de reconciliação de baixa
+frequência (`monitorar`, pela janela temporal) roda periodicamente no mesmo processo.
+Evento e reconciliação podem chegar ao mesmo arquivo: o `ProcessadorImagens` processa
+cada caminho uma vez só, e quem chega depois recebe o resultado como ignorado.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
+
+from config import (
+	PIPELINE_WORKERS, WATCH_DEBOUNCE_SECONDS, WATCH_POLLING, WATCH_POLLING_INTERVALO,
+	WATCH_RECONCILIACAO_MINUTOS,
+)
+from handlers.image_handler import Handler
+from services.api_service import finalizar_envios
+from services.lock_service import drenagem_solicitada
+from services.logging_service import get_app_logger
+from services.monitor_service import monitorar
+from services.pipeline_service import ProcessadorImagens
+from services.readiness_service import ArquivoNaoPronto
+
+logger = get_app_logger()
+
+
+def monitorar_continuamente(diretorio: str) -> int:
+	"""
+	Monitora a origem até Ctrl+C, processando as imagens poucos segundos após chegarem.
+
+	Returns:
+		Quantidade de imagens processadas durante a execução
+	"""
+	origem = Path(diretorio).expanduser().resolve()
+	if not origem.exists():
+		logger.error(f"Diretório de origem não encontrado: {origem}")
+		raise FileNotFoundError(f"Diretório não encontrado: {origem}")
+
+	handler = Handler(debounce=WATCH_DEBOUNCE_SECONDS)
+	if WATCH_POLLING:
+		observer = PollingObserver(timeout=WATCH_POLLING_INTERVALO)
+	else:
+		observer = Observer()
+	observer.schedule(handler, str(origem), recursive=True)
+
+	processadas = 0
+	erros = 0
+	lock_contadores = threading.Lock()
+
+	with ProcessadorImagens() as processador:
+
+		def _processar(arquivo: Path) -> None:
+			nonlocal processadas, erros
+			try:
+				resultado = processador.copiar(arquivo)
+				if resultado is not None and not resultado.ignorado:
+					with lock_contadores:
+						processadas += 1
+			except ArquivoNaoPronto:
+				logger.info(f"Arquivo ainda em cópia, adiado: {arquivo.name}")
+			except Exception as exc:
+				logger.error(f"Erro ao processar {arquivo.name}: {exc}")
+				with lock_contadores:
+					erros += 1
+
+		workers = max(PIPELINE_WORKERS, processador.workers)
+		executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="WatchWorker")
+
+		def _reconciliar() -> None:
+			nonlocal processadas
+			try:
+				# O resumo da API é o da sessão inteira, no fim do modo contínuo
+				quantidade = monitorar(str(origem), processador=processador, resumo_api=False)
+				with lock_contadores:
+					processadas += quantidade
+			except Exception as exc:
+				logger.error(f"Erro na varredura de reconciliação: {exc}")
+
+		observer.start()
+		modo = "polling" if WATCH_POLLING else "eventos do sistema"
+		logger.info(f"MODO CONTÍNUO INICIADO ({modo}) em {origem}")
+
+		# A primeira reconciliação cobre o que chegou enquanto o serviço estava parado
+		intervalo_reconciliacao = WATCH_RECONCILIACAO_MINUTOS * 60
+		proxima_reconciliacao = time.monotonic()
+		reconciliacao = None
+		try:
+			while not drenagem_solicitada():
+				for arquivo in handler.coletar_prontos() + processador.prontidao.prontos_adiados():
+					executor.submit(_processar, arquivo)
+
+				if time.monotonic() >= proxima_reconciliacao and (reconciliacao is None or reconciliacao.done()):
+					reconciliacao = executor.submit(_reconciliar)
+					proxima_reconciliacao = time.monotonic() + intervalo_reconciliacao
+
+				time.sleep(0.5)
+			logger.warning("Drenagem solicitada por outra instância: encerrando o modo contínuo")
+		except KeyboardInterrupt:
+			logger.info("Modo contínuo interrompido pelo usuário")
+		finally:
+			observer.stop()
+			observer.join(timeout=10)
+			# Processa o que já estava estável e aguarda os workers
+			for arquivo in handler.coletar_prontos():
+				executor.submit(_processar, arquivo)
+			executor.shutdown(wait=True)
+
+	resumo_api = finalizar_envios()
+	if resumo_api:
+		logger.info(resumo_api)
+
+	if erros == 0:
+		logger.success(f"IMAGENS PROCESSADAS (modo contínuo): {processadas}")
+	else:
+		logger.error(f"IMAGENS PROCESSADAS (modo contínuo): {processadas} | ERROS: {erros}")
+	return processadas
@@ -0,0 +1,16 @@
+import sqlite3
+from pathlib import Path
+
+
+def abrir_banco(caminho: Path) -> sqlite3.Connection:
+	"""
+	Abre (ou cria) um banco SQLite local usado para persistir estado entre execuções.
+
+	A conexão pode ser compartilhada entre threads; quem a usa concorrentemente
+	deve serializar o acesso com um lock próprio.
+	"""
+	caminho.parent.mkdir(parents=True, exist_ok=True)
+	conexao = sqlite3.connect(str(caminho), timeout=30, check_same_thread=False)
+	conexao.execute("PRAGMA journal_mode=WAL")
+	conexao.execute("PRAGMA synchronous=NORMAL")
+	return conexao
@@ -1,15 +1,112 @@
+import threading
 from pathlib import Path
-from PIL import Image
-from config import EXTS
+from typing import Optional
+from config import EXTS, LOG_DIR
+from utils.db_utils import abrir_banco
 
-def eh_imagem(path: Path) -> bool:
-    if not path.is_file():
+NAO_IMAGENS_FILE = LOG_DIR / "nao_imagens.db"
+
+# Assinaturas (offset, bytes) dos formatos aceitos; lidas apenas do início do arquivo
+_ASSINATURAS = (
+    ("JPEG", 0, b"\xff\xd8\xff"),
+    ("PNG", 0, b"\x89PNG\r\n\x1a\n"),
+    ("GIF", 0, b"GIF87a"),
+    ("GIF", 0, b"GIF89a"),
+    ("BMP", 0, b"BM"),
+    ("TIFF", 0, b"II*\x00"),
+    ("TIFF", 0, b"MM\x00*"),
+    ("ORF", 0, b"IIRO"),
+    ("ICO", 0, b"\x00\x00\x01\x00"),
+)
+_MARCAS_HEIF = {b"heic", b"heix", b"hevc", b"hevx", b"mif1", b"msf1", b"avif"}
+_TAMANHO_CABECALHO = 16
+
+_conexao = None
+_lock = threading.Lock()
+
+
+def detectar_formato(cabecalho: bytes) -> Optional[str]:
+    """Identifica o formato da imagem pelos primeiros bytes do arquivo."""
+    for formato, offset, assinatura in _ASSINATURAS:
+        if cabecalho[offset:offset + len(assinatura)] == assinatura:
+            return formato
+    if cabecalho[:4] == b"RIFF" and cabecalho[8:12] == b"WEBP":
+        return "WEBP"
+    if cabecalho[4:8] == b"ftyp" and cabecalho[8:12] in _MARCAS_HEIF:
+        return "HEIF"
+    return None
+
+
+def _obter_conexao():
+    global _conexao
+    if _conexao is None:
+        _conexao = abrir_banco(NAO_IMAGENS_FILE)
+        _conexao.execute(
+            "CREATE TABLE IF NOT EXISTS nao_imagens ("
+            "caminho TEXT PRIMARY KEY, tamanho INTEGER NOT NULL, mtime REAL NOT NULL)"
+        )
+        _conexao.commit()
+    return _conexao
+
+
+def _rejeitado_anteriormente(caminho: str, tamanho: int, mtime: float) -> bool:
+    try:
+        with _lock:
+            linha = _obter_conexao().execute(
+                "SELECT tamanho, mtime FROM nao_imagens WHERE caminho = ?", (caminho,)
+            ).fetchone()
+        return linha is not None and tuple(linha) == (tamanho, mtime)
+    except Exception:
+        return False
+
+
+def _registrar_rejeicao(caminho: str, tamanho: int, mtime: float) -> None:
+    try:
+        with _lock:
+            conexao = _obter_conexao()
+            with conexao:
+                conexao.execute(
+                    "INSERT OR REPLACE INTO nao_imagens (caminho, tamanho, mtime) VALUES (?, ?, ?)",
+                    (caminho, tamanho, mtime),
+                )
+    except Exception:
+        pass
+
+
+def eh_imagem(path: Path, verificar_arquivo: bool = True) -> bool:
+    """
+    Indica se o arquivo é uma imagem suportada.
+
+    Extensões conhecidas são aceitas direto. Para as demais, apenas o cabeçalho é lido e
+    comparado com as assinaturas de formato; arquivos rejeitados ficam em um cache
+    persistente (caminho, tamanho, mtime) e não são reabertos nas próximas execuções.
+
+    Args:
+        path: Caminho do arquivo
+        verificar_arquivo: False quando quem chama já sabe que é um arquivo regular
+    """
+    if verificar_arquivo and not path.is_file():
         return False
     if path.suffix.lower() in EXTS:
         return True
+
     try:
-        with Image.open(path) as img:
-            img.verify()
-        return True
-    except Exception:
+        stat_info = path.stat()
+    except OSError:
         return False
+
+    caminho = str(path)
+    if _rejeitado_anteriormente(caminho, stat_info.st_size, stat_info.st_mtime):
+        return False
+
+    try:
+        with open(path, "rb") as arquivo:
+            cabecalho = arquivo.read(_TAMANHO_CABECALHO)
+    except OSError:
+        return False
+
+    if detectar_formato(cabecalho):
+        return True
+
+    _registrar_rejeicao(caminho, stat_info.st_size, stat_info.st_mtime)
+    return False